@@ -0,0 +1,292 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, unquote, urlsplit
+
+CONNECTOR_CLASS = 'org.example.FakeSourceConnector'
+STATS_PATH = '/__fake__/stats'
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeConnectCluster:
+    # In-memory Kafka connect cluster with 'connectors' connectors of 'tasks' tasks each. First 'paused' connectors
+    # are paused, first task of 'failed_tasks' connectors is failed. Each request takes at least 'latency' seconds
+    # and fails with 503 with probability 'error_rate'. Worker older than 2.3 ignores 'expand' like real one does.
+    # Restarted task is in RESTARTING state for 'restart_delay' seconds. With 'kafka_down' worker has lost Kafka:
+    # listing and statuses are still answered from memory, all RUNNING, other requests of connectors time out.
+    def __init__(self, connectors=10, tasks=2, latency=0.0, error_rate=0.0, expand=True, version='3.6.0',
+                 failed_tasks=0, paused=0, restart_delay=0.0, kafka_down=False):
+        self.latency = latency
+        self.kafka_down = kafka_down
+        self.restart_delay = restart_delay
+        self.error_rate = error_rate
+        self.expand = expand
+        self.version = version
+        self.requests = 0
+        self.connectors = {}
+        self._lock = threading.Lock()
+        for i in range(connectors):
+            name = f'connector-{i:05d}'
+            self._add(name, {'connector.class': CONNECTOR_CLASS, 'tasks.max': str(tasks), 'topic': f'topic-{i}'})
+            if i < paused:
+                self._set_state(self.connectors[name], 'PAUSED')
+        for connector in list(self.connectors.values())[:failed_tasks]:
+            if connector['tasks']:
+                connector['tasks'][0]['state'] = 'FAILED'
+                connector['tasks'][0]['trace'] = 'java.lang.RuntimeException: injected failure\n' * 20
+
+    def handle(self, method, path, query, body):
+        if path == STATS_PATH:
+            return 200, {'requests': self.requests}
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, _error(503, 'Injected error')
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        with self._lock:
+            return self._route(method, parts, query, body)
+
+    def _route(self, method, parts, query, body):
+        if not parts:
+            return 200, {'version': self.version, 'commit': 'fake', 'kafka_cluster_id': 'fake'}
+        if parts[0] == 'connector-plugins':
+            return self._route_plugins(method, parts[1:], body)
+        if parts[0] != 'connectors':
+            return 404, _error(404, 'Not found')
+        # Real worker answers these from thread that handles requests, which waits for Kafka until request times out.
+        if self.kafka_down and not (len(parts) == 1 and method == 'GET') and parts[-1] != 'status':
+            return 500, _error(500, 'Request timed out')
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, self._list(query.get('expand', []))
+            if method == 'POST':
+                if body['name'] in self.connectors:
+                    return 409, _error(409, f'Connector {body["name"]} already exists')
+                self._add(body['name'], body.get('config', {}))
+                # Workers older than 3.7 ignore initial state.
+                if _version(self.version) >= (3, 7) and body.get('initial_state') == 'PAUSED':
+                    self._set_state(self.connectors[body['name']], 'PAUSED')
+                return 201, self._info(body['name'])
+            return 405, _error(405, 'Method not allowed')
+        name = parts[1]
+        if name not in self.connectors:
+            return 404, _error(404, f'Connector {name} not found')
+        connector = self.connectors[name]
+        resource = parts[2:]
+        if not resource and method == 'GET':
+            return 200, self._info(name)
+        if not resource and method == 'DELETE':
+            del self.connectors[name]
+            return 204, None
+        if resource == ['status']:
+            return 200, self._status(name)
+        if resource == ['config'] and method == 'GET':
+            return 200, connector['config']
+        if resource == ['config'] and method == 'PUT':
+            connector['config'] = _normalize(name, body)
+            return 200, self._info(name)
+        if resource == ['offsets'] and _version(self.version) >= (3, 5):
+            return 200, {'offsets': [{'partition': {'partition': 0}, 'offset': {'position': 42}}]}
+        if resource == ['tasks']:
+            return 200, [{'id': {'connector': name, 'task': task['id']}, 'config': {}} for task in connector['tasks']]
+        if resource in (['pause'], ['resume']):
+            self._set_state(connector, 'PAUSED' if resource == ['pause'] else 'RUNNING')
+            return 202, None
+        if resource == ['restart'] and method == 'POST':
+            # Restart with tasks is supported since 3.0, older workers ignore query and restart only connector.
+            if _version(self.version) >= (3, 0) and query.get('includeTasks') == ['true']:
+                only_failed = query.get('onlyFailed') == ['true']
+                for task in connector['tasks']:
+                    if not only_failed or task['state'] == 'FAILED':
+                        self._restart_task(connector, task)
+                return 202, self._status(name)
+            connector['state'] = 'RUNNING'
+            return 204, None
+        if len(resource) == 3 and resource[0] == 'tasks':
+            tasks = [task for task in connector['tasks'] if str(task['id']) == resource[1]]
+            if not tasks:
+                return 404, _error(404, f'Task {resource[1]} of connector {name} not found')
+            if resource[2] == 'status':
+                self._finish_restarts(connector)
+                return 200, {'id': tasks[0]['id'], 'state': tasks[0]['state'], 'worker_id': tasks[0]['worker_id']}
+            if resource[2] == 'restart' and method == 'POST':
+                self._restart_task(connector, tasks[0])
+                return 204, None
+        return 405, _error(405, 'Method not allowed')
+
+    def _route_plugins(self, method, parts, body):
+        if not parts and method == 'GET':
+            return 200, [{'class': CONNECTOR_CLASS, 'type': 'source', 'version': '1.0'}]
+        if len(parts) == 3 and parts[1:] == ['config', 'validate'] and method == 'PUT':
+            if parts[0] not in (CONNECTOR_CLASS, CONNECTOR_CLASS.rsplit('.', 1)[1]):
+                return 404, _error(404, f'Failed to find any class that implements Connector and which name matches '
+                                        f'{parts[0]}')
+            configs = []
+            for key in ('connector.class', 'name', 'tasks.max', 'topic'):
+                errors = [] if key in body else [f'Missing required configuration "{key}" which has no default value.']
+                configs.append({'definition': {'name': key, 'required': True},
+                                'value': {'name': key, 'value': body.get(key), 'errors': errors}})
+            return 200, {'name': parts[0], 'error_count': sum(len(config['value']['errors']) for config in configs),
+                         'groups': ['Common'], 'configs': configs}
+        return 404, _error(404, 'Not found')
+
+    def _list(self, expand):
+        if not self.expand or not expand:
+            return sorted(self.connectors)
+        connectors = {}
+        for name in sorted(self.connectors):
+            connectors[name] = {}
+            if 'status' in expand:
+                connectors[name]['status'] = self._status(name)
+            if 'info' in expand:
+                connectors[name]['info'] = self._info(name)
+        return connectors
+
+    def _add(self, name, config):
+        config = _normalize(name, config)
+        self.connectors[name] = {
+            'config': config,
+            'state': 'RUNNING',
+            'worker_id': 'worker-1:8083',
+            'tasks': [{'id': task_id, 'state': 'RUNNING', 'worker_id': 'worker-1:8083'}
+                      for task_id in range(int(config.get('tasks.max', '1')))]}
+
+    def _info(self, name):
+        connector = self.connectors[name]
+        return {'name': name,
+                'config': connector['config'],
+                'tasks': [{'connector': name, 'task': task['id']} for task in connector['tasks']],
+                'type': 'source'}
+
+    def _status(self, name):
+        connector = self.connectors[name]
+        self._finish_restarts(connector)
+        return {'name': name,
+                'connector': {'state': connector['state'], 'worker_id': connector['worker_id']},
+                'tasks': [{key: value for key, value in task.items() if key != 'running_at'}
+                          for task in connector['tasks']],
+                'type': 'source'}
+
+    @staticmethod
+    def _finish_restarts(connector):
+        # Task of paused connector is paused once it is started.
+        for task in connector['tasks']:
+            if task.get('running_at', float('inf')) <= time.monotonic():
+                task['state'] = 'PAUSED' if connector['state'] == 'PAUSED' else 'RUNNING'
+                del task['running_at']
+
+    def _restart_task(self, connector, task):
+        task.pop('trace', None)
+        task['running_at'] = time.monotonic() + self.restart_delay
+        if self.restart_delay:
+            task['state'] = 'RESTARTING'
+        else:
+            self._finish_restarts(connector)
+
+    @staticmethod
+    def _set_state(connector, state):
+        connector['state'] = state
+        for task in connector['tasks']:
+            task['state'] = state
+
+
+def serve(cluster, host='127.0.0.1', port=0):
+    # Serves cluster in background thread, returns server and its URL.
+    server = _ThreadingHTTPServer((host, port), _handler(cluster))
+    threading.Thread(target=server.serve_forever, name='fake-connect', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def _handler(cluster):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _handle(self, method):
+            url = urlsplit(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            status, payload = cluster.handle(method, url.path, parse_qs(url.query), body)
+            data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+            self.send_response(status)
+            if payload is not None:
+                self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PUT(self):
+            self._handle('PUT')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _error(status, message):
+    return {'error_code': status, 'message': message}
+
+
+def _normalize(name, config):
+    config = {key: value if isinstance(value, str) else json.dumps(value) for key, value in config.items()}
+    config['name'] = name
+    return config
+
+
+def _version(version):
+    return tuple(int(part) for part in version.split('.')[:2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated Kafka connect REST server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', default=8083, type=int, help='Port to listen on, 0 to pick any free port')
+    parser.add_argument('--connectors', default=10, type=int)
+    parser.add_argument('--tasks', default=2, type=int, help='Number of tasks of each connector')
+    parser.add_argument('--latency', default=0, type=float, help='Latency of each request in seconds')
+    parser.add_argument('--error-rate', default=0, type=float, help='Share of requests that fail with 503')
+    parser.add_argument('--no-expand', default=False, action='store_true',
+                        help='Ignore expand parameter like workers older than 2.3')
+    parser.add_argument('--version', default='3.6.0', help='Kafka version reported by worker')
+    parser.add_argument('--failed-tasks', default=0, type=int, help='Number of connectors with failed task')
+    parser.add_argument('--paused', default=0, type=int, help='Number of paused connectors')
+    parser.add_argument('--restart-delay', default=0, type=float,
+                        help='How long in seconds restarted task is in RESTARTING state')
+    parser.add_argument('--kafka-down', default=False, action='store_true',
+                        help='Answer listing and statuses only, like worker that has lost connection to Kafka')
+    args = parser.parse_args()
+    cluster = FakeConnectCluster(args.connectors, args.tasks, args.latency, args.error_rate, not args.no_expand,
+                                 args.version, args.failed_tasks, args.paused, args.restart_delay, args.kafka_down)
+    server, url = serve(cluster, args.host, args.port)
+    # URL is the first line of output, so it can be read by process which started server.
+    print(url, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kafka_connect.kafka_connect import PARALLELISM, list_connectors, health_check, create_connector, \
+    update_connector, pause_all_connectors, resume_all_connectors, delete_all_connectors  # noqa: E402
+from kafka_connect.transport import Transport  # noqa: E402
+
+FAKE_CONNECT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_connect.py')
+SIZES = (10, 100, 1000, 10000)
+
+
+def _create(url, size, transport, parallelism):
+    for i in range(size):
+        create_connector(url, f'created-{i:05d}',
+                         {'connector.class': 'org.example.FakeSourceConnector', 'tasks.max': '2'},
+                         transport=transport)
+
+
+def _update(url, size, transport, parallelism):
+    for i in range(size):
+        update_connector(url, f'connector-{i:05d}',
+                         {'connector.class': 'org.example.FakeSourceConnector', 'tasks.max': '2',
+                          'topic': f'updated-{i}'},
+                         transport=transport)
+
+
+# Scenario is function of URL, number of connectors, transport and parallelism, and options of fake server it needs.
+SCENARIOS = {
+    'connector list': (lambda url, size, transport, parallelism:
+                       list_connectors(url, transport=transport, parallelism=parallelism), {}),
+    'health-check': (lambda url, size, transport, parallelism:
+                     health_check(url, transport=transport, parallelism=parallelism), {}),
+    'connector pause-all': (lambda url, size, transport, parallelism:
+                            pause_all_connectors(url, None, transport=transport, parallelism=parallelism), {}),
+    'connector resume-all': (lambda url, size, transport, parallelism:
+                             resume_all_connectors(url, None, transport=transport, parallelism=parallelism),
+                             {'paused': True}),
+    'connector delete-all': (lambda url, size, transport, parallelism:
+                             delete_all_connectors(url, None, transport=transport, parallelism=parallelism), {}),
+    'connector create': (_create, {'empty': True}),
+    'connector update': (_update, {}),
+}
+
+
+class FakeServer:
+    # Fake Kafka connect server running in separate process, so it does not affect time and memory of client.
+    def __init__(self, connectors, tasks, latency, error_rate, expand, paused):
+        command = [sys.executable, FAKE_CONNECT, '--port', '0', '--connectors', str(connectors), '--tasks', str(tasks),
+                   '--latency', str(latency), '--error-rate', str(error_rate), '--paused', str(paused)]
+        if not expand:
+            command.append('--no-expand')
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+        self.url = self.process.stdout.readline().strip()
+
+    def requests(self):
+        return requests.get(f'{self.url}/__fake__/stats').json()['requests']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.process.terminate()
+        self.process.wait()
+
+
+def measure(scenario, size, args):
+    # Wall time is measured without tracing allocations, which slows down Python code considerably. Peak memory
+    # of client is measured in separate run.
+    func, options = SCENARIOS[scenario]
+    wall_times = []
+    request_count = None
+    for run in range(args.repeat + 1):
+        with FakeServer(0 if options.get('empty') else size, args.tasks, args.latency, args.error_rate,
+                        not args.no_expand, size if options.get('paused') else 0) as server, \
+                Transport(pool_size=max(args.parallelism, 1)) as transport:
+            traced = run == args.repeat
+            if traced:
+                tracemalloc.start()
+            start = time.perf_counter()
+            func(server.url, size, transport, args.parallelism)
+            duration = time.perf_counter() - start
+            if traced:
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                wall_times.append(duration)
+                request_count = server.requests()
+    return {'scenario': scenario,
+            'connectors': size,
+            'tasks': args.tasks,
+            'expand': not args.no_expand,
+            'latency': args.latency,
+            'parallelism': args.parallelism,
+            'wall_time': min(wall_times),
+            'wall_times': wall_times,
+            'requests': request_count,
+            'peak_memory': peak_memory}
+
+
+def compare(results, baseline):
+    baseline = {(r['scenario'], r['connectors']): r for r in baseline['results']}
+    for result in results:
+        base = baseline.get((result['scenario'], result['connectors']))
+        if base is None:
+            continue
+        print(f'{result["scenario"]:<22} {result["connectors"]:>6}  '
+              f'time x{result["wall_time"] / base["wall_time"]:.2f}  '
+              f'requests {base["requests"]} -> {result["requests"]}  '
+              f'memory x{result["peak_memory"] / max(base["peak_memory"], 1):.2f}', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark kafka_connect against simulated Kafka connect server')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='Comma separated numbers of connectors')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f'Comma separated scenarios, any of: {", ".join(SCENARIOS)}')
+    parser.add_argument('--tasks', default=2, type=int, help='Number of tasks of each connector')
+    parser.add_argument('--latency', default=0, type=float, help='Latency of each request in seconds')
+    parser.add_argument('--error-rate', default=0, type=float, help='Share of requests that fail with 503')
+    parser.add_argument('--no-expand', default=False, action='store_true',
+                        help='Simulate workers older than 2.3 that do not support expanded listing')
+    parser.add_argument('--parallelism', default=PARALLELISM, type=int)
+    parser.add_argument('--repeat', default=3, type=int, help='Number of timed runs, the best one is reported')
+    parser.add_argument('--output', default='benchmark.json', help='File to write results to in JSON format')
+    parser.add_argument('--baseline', help='Results of previous run to compare with')
+    args = parser.parse_args()
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',')]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f'Unknown scenario {scenario}')
+    results = []
+    for size in (int(size) for size in args.sizes.split(',')):
+        for scenario in scenarios:
+            result = measure(scenario, size, args)
+            print(f'{scenario:<22} {size:>6}  {result["wall_time"]:8.3f}s  {result["requests"]:>7} requests  '
+                  f'{result["peak_memory"] / 1024 / 1024:8.2f} MiB', file=sys.stderr)
+            results.append(result)
+    with open(args.output, 'w') as f:
+        json.dump({'timestamp': datetime.now(timezone.utc).isoformat(),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'results': results}, f, indent=4)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that are only needed once command talks to Kafka connect or serves HTTP.
+HEAVY_MODULES = ('requests', 'urllib3', 'http.server', 'aiohttp')
+COMMANDS = (('--help',), ('connector', '--help'), ('task', '--help'))
+
+
+def import_times():
+    # Cumulative import time of each top-level import of CLI module in microseconds, as reported by -X importtime.
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import kafka_connect.__main__'], cwd=ROOT,
+                            stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True, check=True).stderr
+    modules = {}
+    for line in output.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)', line)
+        if match:
+            modules[match.group(2)] = int(match.group(1))
+    return modules
+
+
+def wall_time(command, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'kafka_connect', *command], cwd=ROOT, stdout=subprocess.DEVNULL,
+                       check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that kafka_connect CLI starts fast')
+    parser.add_argument('--max-import-time', default=50, type=float,
+                        help='Maximal cumulative import time of CLI module in milliseconds')
+    parser.add_argument('--max-wall-time', default=0.3, type=float,
+                        help='Maximal median wall time of help commands in seconds')
+    parser.add_argument('--repeat', default=5, type=int, help='Number of runs of each command')
+    parser.add_argument('--output', help='File to write results to in JSON format')
+    args = parser.parse_args()
+
+    modules = import_times()
+    heavy = [module for module in HEAVY_MODULES if module in modules]
+    import_time = modules['kafka_connect.__main__'] / 1000
+    wall_times = {' '.join(command): wall_time(command, args.repeat) for command in COMMANDS}
+
+    failures = []
+    if heavy:
+        failures.append(f'Modules imported on start: {", ".join(heavy)}')
+    if import_time > args.max_import_time:
+        failures.append(f'Import time {import_time:.1f} ms exceeds {args.max_import_time} ms')
+    for command, seconds in wall_times.items():
+        print(f'{command:<20} {seconds * 1000:>8.1f} ms')
+        if seconds > args.max_wall_time:
+            failures.append(f'Wall time of {command} {seconds:.3f} s exceeds {args.max_wall_time} s')
+    print(f'{"import":<20} {import_time:>8.1f} ms')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'import_time_ms': import_time, 'wall_time_s': wall_times, 'heavy_modules': heavy}, f,
+                      indent=4)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,27 @@
 import argparse
+import atexit
 import json
+import os
 import sys
 from argparse import Action
 
-from kafka_connect.kafka_connect import health_check, list_connectors, create_connector, get_connector, \
+from kafka_connect.kafka_connect import health_check, iter_connectors, create_connector, get_connector, \
     get_connector_config, update_connector, pause_connector, pause_all_connectors, resume_connector, \
-    resume_all_connectors, restart_connector, delete_connector, delete_all_connectors, list_connector_tasks, \
-    restart_connector_task
+    resume_all_connectors, restart_connector, delete_connector, delete_all_connectors, iter_connector_tasks, \
+    restart_connector_task, restart_failed_tasks, apply_connectors, wait_for_connectors, snapshot_connectors, \
+    restore_connectors, write_snapshot, read_snapshot, validate_connectors, State, PARALLELISM, WAIT_TIMEOUT
+from kafka_connect.transport import Transport, RetryPolicy, RetryBudget, Governor, CONNECT_TIMEOUT, READ_TIMEOUT, \
+    POOL_SIZE, ROUND_ROBIN, LEAST_LATENCY, COOLDOWN, MAX_FAILURES, DELAY, MAX_DELAY, RETRY_BUDGET, RETRYABLE_STATUSES
+from kafka_connect.inventory import read_inventory, select_clusters, for_each_cluster, merge_results, \
+    health_check_in_clusters
+from kafka_connect.watch import watch_health, INTERVAL, JITTER
+from kafka_connect.instrumentation import RequestStats, TraceWriter
+from kafka_connect.batch import read_stages, run_batch, Shell
+from kafka_connect.filters import parse_where
+
+JSON = 'json'
+NDJSON = 'ndjson'
+TABLE = 'table'
 
 
 class ParseConfigurationFileAction(Action):
@@ -18,47 +33,379 @@ class ParseConfigurationFileAction(Action):
                 setattr(namespace, 'configuration', f.read())
 
 
+def read_configurations(path):
+    # Reads connector configurations from file or from all JSON files in directory. File may contain one or more
+    # JSON documents, either one after another or as an array. Document is either {"name": ..., "config": {...}}
+    # or plain configuration with name of connector in 'name', otherwise name of file is used as connector name.
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.json'))
+    else:
+        paths = [path]
+    configurations = {}
+    for file_path in paths:
+        if file_path == '-':
+            documents = read_json_documents(sys.stdin.read())
+            default_name = None
+        else:
+            with open(file_path, 'r') as f:
+                documents = read_json_documents(f.read())
+            default_name = os.path.splitext(os.path.basename(file_path))[0]
+        add_configurations(configurations, documents, default_name, 'standard input' if file_path == '-' else file_path)
+    return configurations
+
+
+def add_configurations(configurations, documents, default_name, source):
+    # 'default_name' is used for the only document without name, None if name has to be specified.
+    for document in documents:
+        if 'config' in document:
+            name, configuration = document['name'], document['config']
+        elif 'name' in document:
+            name, configuration = document['name'], document
+        elif len(documents) == 1 and default_name is not None:
+            name, configuration = default_name, document
+        else:
+            raise ValueError(f'Name of connector is not specified in {source}')
+        if name in configurations:
+            raise ValueError(f'Connector {name} is configured more than once')
+        configurations[name] = configuration
+
+
+def read_json_documents(text):
+    decoder = json.JSONDecoder()
+    documents = []
+    position = 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position == len(text):
+            return documents
+        document, position = decoder.raw_decode(text, position)
+        if isinstance(document, list):
+            documents.extend(document)
+        else:
+            documents.append(document)
+
+
 def exception_handler(exception_type, exception, traceback):
+    if isinstance(exception, BrokenPipeError):
+        # Output is piped to command that has exited already, e.g. head. Rest of output is discarded.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
     print(f'Error: {exception}')
 
 
+def print_bulk_report(report):
+    print(json.dumps(report, indent=4))
+    if any(r['result'] == 'failed' for r in report):
+        sys.exit(1)
+
+
+def print_read_result(clusters, url, transport, func, key=None, output=JSON):
+    # Prints result of func(url, transport) or, if clusters are selected, merged results of all clusters. With 'key'
+    # result of each cluster is put in record under that key instead of being merged in record itself. Result is
+    # either one record or iterable of records, which are printed as they are read.
+    if clusters is None:
+        result = func(url, transport)
+        if isinstance(result, dict):
+            print(json.dumps(result, indent=4))
+        else:
+            print_records(result, output)
+        return
+
+    def read(cluster):
+        result = func(cluster.url, cluster.transport)
+        if not isinstance(result, dict):
+            result = list(result)
+        return {key: result} if key else result
+
+    records = merge_results(for_each_cluster(clusters, read))
+    print_records(records, output)
+    if any('error' in record for record in records):
+        sys.exit(1)
+
+
+def print_records(records, output=JSON):
+    # JSON array is printed in the same format as json.dumps(list(records), indent=4), but record by record.
+    if output == NDJSON:
+        for record in records:
+            print(json.dumps(record), flush=True)
+    elif output == TABLE:
+        print_table(list(records))
+    else:
+        separator = '['
+        for record in records:
+            print(separator + '\n    ' + json.dumps(record, indent=4).replace('\n', '\n    '), end='', flush=True)
+            separator = ','
+        print('[]' if separator == '[' else '\n]')
+
+
+def print_table(records):
+    # Columns are aligned to the widest value, so table is printed once all records are read. Only the first line of
+    # multi-line values, e.g. stack traces, is shown.
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, list):
+            return ','.join(map(str, value))
+        text = str(value)
+        return text.splitlines()[0] if text else text
+
+    columns = []
+    for record in records:
+        columns.extend(column for column in record if column not in columns)
+    rows = [[column.upper() for column in columns]] + [[cell(record.get(column)) for column in columns]
+                                                         for record in records]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+
+def transport_options(args):
+    # Keep at least one connection per concurrent request, otherwise connections are discarded instead of reused.
+    pool_size = max(args.pool_size, getattr(args, 'parallelism', 1))
+    verify = args.ca_cert if args.ca_cert is not None else not args.insecure
+    cert = (args.cert, args.key) if args.cert is not None and args.key is not None else args.cert
+    auth = (args.user, args.password or '') if args.user is not None else None
+    retry_policy = RetryPolicy(max_attempts=getattr(args, 'backoff_limit', 1), delay=getattr(args, 'delay', DELAY),
+                               max_delay=args.max_delay, deadline=args.deadline,
+                               retryable_statuses=parse_statuses(args.retry_on))
+    governor = None
+    if args.max_rate is not None or args.max_reads is not None or args.max_writes is not None or args.adaptive:
+        governor = Governor(args.max_rate, args.max_reads, args.max_writes, args.adaptive)
+    return dict(pool_size=pool_size, keep_alive=not args.no_keep_alive, connect_timeout=args.connect_timeout,
+                read_timeout=args.read_timeout, verify=verify, cert=cert, auth=auth, strategy=args.balance,
+                max_failures=args.max_failures, cooldown=args.cooldown, retry_policy=retry_policy,
+                retry_budget=RetryBudget(args.retry_budget), governor=governor)
+
+
+def report_throttling(transport, clusters):
+    # Throttling is reported when process exits, if any request has been throttled.
+    governors = [('', transport.governor)] if transport is not None else []
+    governors += [(f'[{cluster.name}] ', cluster.transport.governor) for cluster in clusters or []]
+
+    def report():
+        for prefix, governor in governors:
+            if governor is not None and (governor.throttled or governor.slowdowns):
+                print(f'{prefix}{governor.format()}', file=sys.stderr)
+
+    atexit.register(report)
+
+
+def wait_for_connector(args, transport):
+    # Used by commands which change connector with --wait, fails if connector does not get running.
+    result = wait_for_connectors(args.url, [args.name], timeout=args.timeout, transport=transport,
+                                 parallelism=1)[0]
+    if result['result'] != 'ok':
+        raise RuntimeError(result['error'])
+
+
+def instrumentation_hooks(args):
+    # Statistics are printed and trace is closed when process exits, even if command has failed.
+    hooks = []
+    if getattr(args, 'stats', False):
+        stats = RequestStats()
+        hooks.append(stats)
+        atexit.register(lambda: print(stats.format(), file=sys.stderr))
+    if getattr(args, 'trace', None) is not None:
+        trace_file = open(args.trace, 'w')
+        hooks.append(TraceWriter(trace_file))
+        atexit.register(trace_file.close)
+    return hooks
+
+
+def parse_statuses(statuses):
+    return frozenset(int(status) for status in statuses.split(',') if status.strip())
+
+
 def main():
     sys.excepthook = exception_handler
+    parser = build_parser(requested_commands(sys.argv[1:]))
+    run(parser, parser.parse_args())
+
+
+def requested_commands(argv):
+    # Command is the first argument that is not an option, nothing is requested if only help is asked for.
+    for arg in argv:
+        if not arg.startswith('-'):
+            return [arg]
+    return []
+
+
+def build_parser(commands=None):
+    # Only parsers of given commands are built with their options and subcommands, others are just listed in help,
+    # so CLI does not spend time on parsers it does not need. All commands are built by default.
+    def requested(command):
+        return commands is None or command in commands
+
     common_parser = argparse.ArgumentParser(add_help=False)
-    common_parser.add_argument('--url', help='Kafka connect server URL', required=False,
-                               default='http://localhost:8083')
+    common_parser.add_argument('--url', help='Kafka connect server URL or comma separated URLs of workers',
+                               required=False, default='http://localhost:8083')
+    common_parser.add_argument('--balance', default=ROUND_ROBIN, choices=[ROUND_ROBIN, LEAST_LATENCY],
+                               help='How to spread reads between workers')
+    common_parser.add_argument('--cooldown', default=COOLDOWN, type=float,
+                               help='How long in seconds not to use worker after connections to it have failed '
+                                    '--max-failures times in a row')
+    common_parser.add_argument('--max-failures', default=MAX_FAILURES, type=int,
+                               help='Number of failed connections in a row after which worker is not used')
+    common_parser.add_argument('--connect-timeout', default=CONNECT_TIMEOUT, type=float,
+                               help='How long to wait in seconds for connection to Kafka connect server')
+    common_parser.add_argument('--read-timeout', default=READ_TIMEOUT, type=float,
+                               help='How long to wait in seconds for response from Kafka connect server')
+    common_parser.add_argument('--pool-size', default=POOL_SIZE, type=int,
+                               help='Max number of connections kept open to Kafka connect server')
+    common_parser.add_argument('--no-keep-alive', default=False, action='store_true',
+                               help='Close connection after each request')
+    common_parser.add_argument('--ca-cert', help='Path to CA bundle used to verify server certificate')
+    common_parser.add_argument('--insecure', default=False, action='store_true',
+                               help='Do not verify server certificate')
+    common_parser.add_argument('--cert', help='Path to client certificate')
+    common_parser.add_argument('--key', help='Path to client certificate private key')
+    common_parser.add_argument('--user', help='User name for basic authentication')
+    common_parser.add_argument('--password', help='Password for basic authentication')
+    common_parser.add_argument('--max-delay', default=MAX_DELAY, type=float,
+                               help='Max delay in seconds between retry attempts')
+    common_parser.add_argument('--deadline', type=float,
+                               help='How long in seconds command may take, no retry is made after that')
+    common_parser.add_argument('--retry-on', default=','.join(map(str, sorted(RETRYABLE_STATUSES))),
+                               help='Comma separated response statuses on which request is retried')
+    common_parser.add_argument('--retry-budget', default=RETRY_BUDGET, type=float,
+                               help='Max share of retries among all requests')
+    common_parser.add_argument('--max-rate', type=float,
+                               help='Max number of writes per second, the leader handles all writes')
+    common_parser.add_argument('--max-reads', type=int, help='Max number of concurrent reads')
+    common_parser.add_argument('--max-writes', type=int, help='Max number of concurrent writes')
+    common_parser.add_argument('--adaptive', default=False, action='store_true',
+                               help='Slow down writes when worker answers 409 (rebalance in progress) or '
+                                    'latency of writes rises')
+    common_parser.add_argument('--stats', default=False, action='store_true',
+                               help='Print number and latency of requests to each endpoint to stderr on exit')
+    common_parser.add_argument('--trace', help='Path to file to write each request to, one JSON object per line')
     backoff_parser = argparse.ArgumentParser(add_help=False)
-    backoff_parser.add_argument('--backoff-limit', default=1, help='Number of retries before fail', type=int)
-    backoff_parser.add_argument('--delay', default=0, help='How long to wait in seconds between retry attempts',
+    backoff_parser.add_argument('--backoff-limit', default=1, help='Number of attempts of each request before fail',
                                 type=int)
+    backoff_parser.add_argument('--delay', default=DELAY, type=float,
+                                help='How long to wait in seconds before the first retry, '
+                                     'delay doubles with each next attempt')
+    clusters_parser = argparse.ArgumentParser(add_help=False)
+    clusters_parser.add_argument('--inventory', default=os.environ.get('KAFKA_CONNECT_INVENTORY'),
+                                 help='Path to inventory file with URLs of Kafka connect clusters, '
+                                      'default is taken from KAFKA_CONNECT_INVENTORY environment variable')
+    clusters_parser.add_argument('--clusters',
+                                 help='Comma separated names of clusters from inventory or "all", '
+                                      'query all of them concurrently instead of --url')
     verbose_parser = argparse.ArgumentParser(add_help=False)
     verbose_parser.add_argument('--verbose', action='store_true', default=False)
+    wait_parser = argparse.ArgumentParser(add_help=False)
+    wait_parser.add_argument('--wait', default=False, action='store_true',
+                             help='Wait until connector and its tasks are running')
+    wait_parser.add_argument('--timeout', default=WAIT_TIMEOUT, type=float,
+                             help='How long to wait in seconds for connector to get running')
+    parallelism_parser = argparse.ArgumentParser(add_help=False)
+    parallelism_parser.add_argument('--parallelism', default=PARALLELISM, type=int,
+                                    help='Max number of concurrent requests to Kafka connect server')
+    where_parser = argparse.ArgumentParser(add_help=False)
+    where_parser.add_argument('--where', action='append',
+                              help='Condition on connector, repeat to combine conditions: name, class, topic, state '
+                                   '(as listed, the worst of connector and its tasks), connector-state (of connector '
+                                   'itself), worker or failed-tasks, operator =, !=, ~ (regular expression), !~ or, '
+                                   'for failed-tasks, >, >=, <, <=, e.g. --where state=PAUSED --where '
+                                   'class~io.debezium.*')
+    output_parser = argparse.ArgumentParser(add_help=False)
+    output_parser.add_argument('--output', default=JSON, choices=[JSON, NDJSON, TABLE],
+                               help='Output format, ndjson prints one JSON object per line as soon as it is read')
 
     parser = argparse.ArgumentParser()
 
     # commands
     main_command_parser = parser.add_subparsers(dest='cmd', help='Commands', title='Commands')
-    health_check_command_parser = main_command_parser.add_parser('health-check',
-                                                                 help='Check all connectors and their tasks',
-                                                                 parents=[common_parser, verbose_parser])
+    health_check_command_parser = main_command_parser.add_parser(
+        'health-check', help='Check all connectors and their tasks',
+        parents=[common_parser, backoff_parser, verbose_parser, parallelism_parser, clusters_parser, where_parser]
+        if requested('health-check') else [])
+    if requested('health-check'):
+        health_check_command_parser.add_argument('--watch', default=False, action='store_true',
+                                                 help='Check health periodically and serve result over HTTP: '
+                                                      'Prometheus metrics on /metrics, health verdict on /health')
+        health_check_command_parser.add_argument('--interval', default=INTERVAL, type=float,
+                                                 help='How long to wait in seconds between checks in watch mode')
+        health_check_command_parser.add_argument('--jitter', default=JITTER, type=float,
+                                                 help='Random deviation of interval between checks, as fraction of it')
+        health_check_command_parser.add_argument('--host', default='', help='Address to listen on in watch mode')
+        health_check_command_parser.add_argument('--port', default=9400, type=int,
+                                                 help='Port to listen on in watch mode')
     connector_command_parser = main_command_parser.add_parser('connector', help='Connector commands')
+    if requested('connector'):
+        add_connector_commands(connector_command_parser, common_parser, backoff_parser, parallelism_parser,
+                               clusters_parser, output_parser, wait_parser, where_parser)
     connector_task_parser = main_command_parser.add_parser('task', help='Connector task commands')
+    if requested('task'):
+        add_task_commands(connector_task_parser, common_parser, backoff_parser, parallelism_parser, clusters_parser,
+                          output_parser)
+    batch_command_parser = main_command_parser.add_parser('batch',
+                                                          help='Run commands from file in one process, '
+                                                               'sharing connections between them',
+                                                          parents=[common_parser, parallelism_parser]
+                                                          if requested('batch') else [])
+    if requested('batch'):
+        batch_command_parser.add_argument('--file', default='-',
+                                          help='Path to file with one command per line, blank line separates stages '
+                                               'of independent commands, - to read from standard input')
+        batch_command_parser.add_argument('--keep-going', default=False, action='store_true',
+                                          help='Run next stages even if command has failed')
+    snapshot_command_parser = main_command_parser.add_parser('snapshot',
+                                                             help='Save configurations of all connectors to file',
+                                                             parents=[common_parser, backoff_parser,
+                                                                      parallelism_parser]
+                                                             if requested('snapshot') else [])
+    if requested('snapshot'):
+        snapshot_command_parser.add_argument('--file', required=True,
+                                             help='Path to file to write gzip compressed snapshot to, '
+                                                  '- to write to standard output')
+        snapshot_command_parser.add_argument('--name', help='Connector name pattern', required=False)
+        snapshot_command_parser.add_argument('--include-state', default=False, action='store_true',
+                                             help='Save state of connectors, so paused ones can be restored paused')
+        snapshot_command_parser.add_argument('--include-offsets', default=False, action='store_true',
+                                             help='Save offsets of connectors, if worker supports reading them')
+    restore_command_parser = main_command_parser.add_parser('restore',
+                                                            help='Create or update connectors from snapshot',
+                                                            parents=[common_parser, backoff_parser,
+                                                                     parallelism_parser]
+                                                            if requested('restore') else [])
+    if requested('restore'):
+        restore_command_parser.add_argument('--file', required=True,
+                                            help='Path to snapshot file, - to read from standard input')
+        restore_command_parser.add_argument('--name', help='Connector name pattern', required=False)
+        restore_command_parser.add_argument('--restore-state', default=False, action='store_true',
+                                            help='Pause or resume connectors to match their state in snapshot, '
+                                                 'workers since 3.7 create paused connectors paused')
+        restore_command_parser.add_argument('--dry-run', default=False, action='store_true',
+                                            help='Show changes without applying them')
+    main_command_parser.add_parser('shell', help='Run commands interactively, sharing connections between them',
+                                   parents=[common_parser] if requested('shell') else [])
+    return parser
+
 
-    # connector
+def add_connector_commands(connector_command_parser, common_parser, backoff_parser, parallelism_parser,
+                           clusters_parser, output_parser, wait_parser, where_parser):
     connector_subcommand_parser = connector_command_parser.add_subparsers(dest='connector_command')
 
     # list
-    connector_subcommand_parser.add_parser('list', help='List connectors', parents=[common_parser])
+    connector_subcommand_parser.add_parser('list', help='List connectors',
+                                           parents=[common_parser, backoff_parser, parallelism_parser,
+                                                    clusters_parser, output_parser, where_parser])
 
     connector_common_parser = argparse.ArgumentParser(add_help=False)
     connector_common_parser.add_argument('--name', help='Connector name', required=True)
 
     connector_batch_parser = argparse.ArgumentParser(add_help=False)
     connector_batch_parser.add_argument('--name', help='Connector name pattern', required=False)
+    connector_batch_parser.add_argument('--verbose', action='store_true', default=False,
+                                        help='Deprecated, has no effect, report is always printed')
 
     create_connector_command_parser = connector_subcommand_parser.add_parser('create', help='Create new connector',
                                                                              parents=[common_parser, backoff_parser,
-                                                                                      connector_common_parser])
+                                                                                      connector_common_parser,
+                                                                                      wait_parser])
     create_connector_configuration = create_connector_command_parser.add_mutually_exclusive_group(required=True)
     create_connector_configuration.add_argument('--configuration', help='Connector configuration as JSON string')
     create_connector_configuration.add_argument('--configuration-file',
@@ -68,37 +415,84 @@ def main():
                                                  help='Attempt to create connector only if connector does not already exist',
                                                  action='store_true')
 
+    # apply
+    apply_connector_command_parser = connector_subcommand_parser.add_parser('apply',
+                                                                            help='Create, update or delete connectors '
+                                                                                 'to match configurations',
+                                                                            parents=[common_parser, backoff_parser,
+                                                                                     parallelism_parser])
+    apply_connector_command_parser.add_argument('--path', required=True,
+                                                help='Path to file or directory with connector configurations '
+                                                     'in JSON format, - to read from standard input')
+    apply_connector_command_parser.add_argument('--prune', default=False, action='store_true',
+                                                help='Delete connectors that are not in configurations')
+    apply_connector_command_parser.add_argument('--dry-run', default=False, action='store_true',
+                                                help='Show changes without applying them')
+
+    # validate
+    validate_connector_command_parser = connector_subcommand_parser.add_parser('validate',
+                                                                               help='Validate connector '
+                                                                                    'configurations by plugins',
+                                                                               parents=[common_parser, backoff_parser,
+                                                                                        parallelism_parser])
+    validate_connector_configuration = validate_connector_command_parser.add_mutually_exclusive_group(required=True)
+    validate_connector_configuration.add_argument('--configuration', help='Connector configuration as JSON string')
+    validate_connector_configuration.add_argument('--configuration-file',
+                                                  help='Path to file with connector configuration in JSON format',
+                                                  action=ParseConfigurationFileAction)
+    validate_connector_configuration.add_argument('--path',
+                                                  help='Path to file or directory with connector configurations '
+                                                       'in JSON format')
+    validate_connector_command_parser.add_argument('--name', help='Connector name, if it is not in configuration')
+
     # get
     connector_subcommand_parser.add_parser('get', help='Get connector',
-                                           parents=[common_parser, backoff_parser, connector_common_parser])
+                                           parents=[common_parser, backoff_parser, connector_common_parser,
+                                                    clusters_parser])
 
     # get configuration
     connector_subcommand_parser.add_parser('configuration', help='Get connector\'s configuration',
-                                           parents=[common_parser, backoff_parser, connector_common_parser])
+                                           parents=[common_parser, backoff_parser, connector_common_parser,
+                                                    clusters_parser])
 
     # update
     update_connector_command_parser = connector_subcommand_parser.add_parser('update', help='Update connector',
                                                                              parents=[common_parser, backoff_parser,
-                                                                                      connector_common_parser])
+                                                                                      connector_common_parser,
+                                                                                      wait_parser])
     update_connector_configuration = update_connector_command_parser.add_mutually_exclusive_group(required=True)
     update_connector_configuration.add_argument('--configuration', help='Connector configuration as JSON string')
     update_connector_configuration.add_argument('--configuration-file',
                                                 help='Path to file with connector configuration in JSON format',
                                                 action=ParseConfigurationFileAction)
 
+    # wait
+    wait_connector_command_parser = connector_subcommand_parser.add_parser('wait',
+                                                                           help='Wait until connectors and their '
+                                                                                'tasks are in state',
+                                                                           parents=[common_parser, backoff_parser,
+                                                                                    parallelism_parser])
+    wait_connectors = wait_connector_command_parser.add_mutually_exclusive_group(required=True)
+    wait_connectors.add_argument('--name', help='Connector name')
+    wait_connectors.add_argument('--pattern', help='Connector name pattern')
+    wait_connector_command_parser.add_argument('--state', default=State.RUNNING.name,
+                                               choices=[State.RUNNING.name, State.PAUSED.name])
+    wait_connector_command_parser.add_argument('--timeout', default=WAIT_TIMEOUT, type=float,
+                                               help='How long to wait in seconds')
+
     # pause
     connector_subcommand_parser.add_parser('pause', help='Pause connector',
                                            parents=[common_parser, backoff_parser, connector_common_parser])
     connector_subcommand_parser.add_parser('pause-all', help='Pause all connectors',
                                            parents=[common_parser, backoff_parser, connector_batch_parser,
-                                                    verbose_parser])
+                                                    parallelism_parser, where_parser])
 
     # resume
     connector_subcommand_parser.add_parser('resume', help='Resume connector',
                                            parents=[common_parser, backoff_parser, connector_common_parser])
     connector_subcommand_parser.add_parser('resume-all', help='Resume all connectors',
                                            parents=[common_parser, backoff_parser, connector_batch_parser,
-                                                    verbose_parser])
+                                                    parallelism_parser, where_parser])
 
     # restart
     connector_subcommand_parser.add_parser('restart', help='Restart connector',
@@ -109,16 +503,20 @@ def main():
                                            parents=[common_parser, backoff_parser, connector_common_parser])
     connector_subcommand_parser.add_parser('delete-all', help='Delete all connectors',
                                            parents=[common_parser, backoff_parser, connector_batch_parser,
-                                                    verbose_parser])
+                                                    parallelism_parser, where_parser])
 
-    # connector task
+
+def add_task_commands(connector_task_parser, common_parser, backoff_parser, parallelism_parser, clusters_parser,
+                      output_parser):
     connector_task_common_parser = argparse.ArgumentParser(add_help=False)
     connector_task_common_parser.add_argument('--connector', help='Connector name', required=True)
 
     connector_task_subcommand_parser = connector_task_parser.add_subparsers(dest='task_command')
     # list
     connector_task_subcommand_parser.add_parser('list', help='List connector tasks',
-                                                parents=[common_parser, connector_task_common_parser])
+                                                parents=[common_parser, backoff_parser,
+                                                         connector_task_common_parser, clusters_parser,
+                                                         output_parser])
 
     # restart
     restart_connector_task_command_parser = connector_task_subcommand_parser.add_parser('restart',
@@ -128,57 +526,174 @@ def main():
                                                                                                  connector_task_common_parser])
     restart_connector_task_command_parser.add_argument('--task', help='Task ID', required=True)
 
-    args = parser.parse_args()
+    # restart failed
+    restart_failed_tasks_command_parser = connector_task_subcommand_parser.add_parser(
+        'restart-failed', help='Restart failed tasks of all connectors',
+        parents=[common_parser, backoff_parser, parallelism_parser])
+    restart_failed_tasks_command_parser.add_argument('--connector', help='Connector name pattern', required=False)
+    restart_failed_tasks_command_parser.add_argument('--wait', default=False, action='store_true',
+                                                     help='Wait until restarted tasks are running')
+    restart_failed_tasks_command_parser.add_argument('--timeout', default=WAIT_TIMEOUT, type=float,
+                                                     help='How long to wait in seconds for restarted tasks')
+
+
+def run(parser, args, transport=None):
+    # Runs command parsed from command line. Batch and shell pass their transport, then connections are shared by
+    # all commands and transport options of each command are ignored.
+    owned = transport is None
+    if not owned:
+        hooks = transport.hooks
+    else:
+        hooks = instrumentation_hooks(args)
+        transport = Transport(hooks=hooks, **transport_options(args)) if hasattr(args, 'url') else None
+    clusters = None
+    if getattr(args, 'clusters', None) is not None:
+        if args.inventory is None:
+            parser.error('--inventory is required with --clusters')
+        clusters = select_clusters(read_inventory(args.inventory, hooks=hooks, **transport_options(args)),
+                                   args.clusters)
+    if owned:
+        report_throttling(transport, clusters)
 
     if args.cmd == 'health-check':
-        sys.exit(health_check(args.url, args.verbose))
+        if args.watch:
+            if clusters is not None:
+                parser.error('--watch can not be used with --clusters')
+            watch_health(args.url, args.host, args.port, args.interval, args.jitter, transport=transport,
+                         parallelism=args.parallelism, verbose=args.verbose,
+                         connector_filter=parse_where(args.where))
+        elif clusters is not None:
+            sys.exit(health_check_in_clusters(clusters, args.verbose, parallelism=args.parallelism,
+                                              connector_filter=parse_where(args.where)))
+        else:
+            sys.exit(health_check(args.url, args.verbose, transport=transport, parallelism=args.parallelism,
+                                  connector_filter=parse_where(args.where)))
     elif args.cmd == 'connector':
         if args.connector_command == 'list':
-            print(json.dumps(list_connectors(args.url), indent=4))
+            print_read_result(clusters, args.url, transport,
+                              lambda url, transport: iter_connectors(url, transport=transport,
+                                                                     parallelism=args.parallelism,
+                                                                     connector_filter=parse_where(args.where)),
+                              output=args.output)
         elif args.connector_command == 'create':
             print(json.dumps(
                 create_connector(args.url, args.name, json.loads(args.configuration), args.if_not_exists,
                                  args.backoff_limit,
-                                 args.delay),
+                                 args.delay,
+                                 transport=transport),
                 indent=4))
+            if args.wait:
+                wait_for_connector(args, transport)
         elif args.connector_command == 'update':
             print(json.dumps(
-                update_connector(args.url, args.name, json.loads(args.configuration), args.backoff_limit, args.delay),
+                update_connector(args.url, args.name, json.loads(args.configuration), args.backoff_limit, args.delay,
+                                 transport=transport),
                 indent=4))
+            if args.wait:
+                wait_for_connector(args, transport)
+        elif args.connector_command == 'wait':
+            print_bulk_report(wait_for_connectors(args.url, [args.name] if args.name is not None else None,
+                                                  args.pattern, State[args.state], args.timeout, args.backoff_limit,
+                                                  args.delay, transport=transport, parallelism=args.parallelism))
+        elif args.connector_command == 'apply':
+            print_bulk_report(apply_connectors(args.url, read_configurations(args.path), args.prune, args.dry_run,
+                                               args.backoff_limit, args.delay, transport=transport,
+                                               parallelism=args.parallelism))
+        elif args.connector_command == 'validate':
+            if args.path is not None:
+                configurations = read_configurations(args.path)
+            else:
+                configurations = {}
+                add_configurations(configurations, read_json_documents(args.configuration), args.name,
+                                   'configuration')
+            print_bulk_report(validate_connectors(args.url, configurations, args.backoff_limit, args.delay,
+                                                  transport=transport, parallelism=args.parallelism))
         elif args.connector_command == 'get':
-            print(json.dumps(
-                get_connector(args.url, args.name, args.backoff_limit, args.delay),
-                indent=4))
+            print_read_result(clusters, args.url, transport,
+                              lambda url, transport: get_connector(url, args.name, args.backoff_limit, args.delay,
+                                                                   transport=transport))
         elif args.connector_command == 'configuration':
-            print(json.dumps(
-                get_connector_config(args.url, args.name, args.backoff_limit, args.delay),
-                indent=4))
+            print_read_result(clusters, args.url, transport,
+                              lambda url, transport: get_connector_config(url, args.name, args.backoff_limit,
+                                                                          args.delay, transport=transport),
+                              key='configuration')
         elif args.connector_command == 'pause':
-            pause_connector(args.url, args.name, args.backoff_limit, args.delay)
+            pause_connector(args.url, args.name, args.backoff_limit, args.delay, transport=transport)
         elif args.connector_command == 'pause-all':
-            pause_all_connectors(args.url, args.name, args.backoff_limit, args.delay, args.verbose)
+            print_bulk_report(pause_all_connectors(args.url, args.name, args.backoff_limit, args.delay,
+                                                   transport=transport, parallelism=args.parallelism,
+                                                   connector_filter=parse_where(args.where)))
         elif args.connector_command == 'resume':
-            resume_connector(args.url, args.name, args.backoff_limit, args.delay)
+            resume_connector(args.url, args.name, args.backoff_limit, args.delay, transport=transport)
         elif args.connector_command == 'resume-all':
-            resume_all_connectors(args.url, args.name, args.backoff_limit, args.delay, args.verbose)
+            print_bulk_report(resume_all_connectors(args.url, args.name, args.backoff_limit, args.delay,
+                                                    transport=transport, parallelism=args.parallelism,
+                                                    connector_filter=parse_where(args.where)))
         elif args.connector_command == 'restart':
-            restart_connector(args.url, args.name, args.backoff_limit, args.delay)
+            restart_connector(args.url, args.name, args.backoff_limit, args.delay, transport=transport)
         elif args.connector_command == 'delete':
-            delete_connector(args.url, args.name, args.backoff_limit, args.delay)
+            delete_connector(args.url, args.name, args.backoff_limit, args.delay, transport=transport)
         elif args.connector_command == 'delete-all':
-            delete_all_connectors(args.url, args.name, args.backoff_limit, args.delay, args.verbose)
+            print_bulk_report(delete_all_connectors(args.url, args.name, args.backoff_limit, args.delay,
+                                                    transport=transport, parallelism=args.parallelism,
+                                                    connector_filter=parse_where(args.where)))
         else:
             print(parser.format_help())
     elif args.cmd == 'task':
         if args.task_command == 'list':
-            print(json.dumps(list_connector_tasks(args.url, args.connector), indent=4))
+            print_read_result(clusters, args.url, transport,
+                              lambda url, transport: iter_connector_tasks(url, args.connector, transport=transport),
+                              output=args.output)
         elif args.task_command == 'restart':
-            restart_connector_task(args.url, args.connector, args.task, args.backoff_limit, args.delay)
+            restart_connector_task(args.url, args.connector, args.task, args.backoff_limit, args.delay,
+                                   transport=transport)
+        elif args.task_command == 'restart-failed':
+            print_bulk_report(restart_failed_tasks(args.url, args.connector, args.wait, args.timeout,
+                                                   args.backoff_limit, args.delay, transport=transport,
+                                                   parallelism=args.parallelism))
         else:
             print(parser.format_help())
+    elif args.cmd == 'snapshot':
+        snapshot = snapshot_connectors(args.url, args.name, args.include_state, args.include_offsets,
+                                       args.backoff_limit, args.delay, transport=transport,
+                                       parallelism=args.parallelism)
+        write_snapshot(snapshot, sys.stdout.buffer if args.file == '-' else args.file)
+        if args.file != '-':
+            print(json.dumps({'file': args.file, 'connectors': len(snapshot['connectors'])}, indent=4))
+    elif args.cmd == 'restore':
+        snapshot = read_snapshot(sys.stdin.buffer if args.file == '-' else args.file)
+        print_bulk_report(restore_connectors(args.url, snapshot, args.name, args.restore_state, args.dry_run,
+                                             args.backoff_limit, args.delay, transport=transport,
+                                             parallelism=args.parallelism))
+    elif args.cmd == 'batch':
+        if args.file == '-':
+            stages = read_stages(sys.stdin.read().splitlines())
+        else:
+            with open(args.file, 'r') as f:
+                stages = read_stages(f.read().splitlines())
+        sys.exit(run_batch(stages, command_executor(build_parser(), args, transport), args.parallelism,
+                           args.keep_going))
+    elif args.cmd == 'shell':
+        Shell(command_executor(build_parser(), args, transport), ['health-check', 'connector', 'task', 'snapshot',
+                                                                   'restore']).cmdloop()
     else:
         print(parser.format_help())
 
 
+def command_executor(parser, args, transport):
+    # Returns function that runs command given as list of arguments with transport of batch or shell. Command
+    # without --url is sent to URL of batch or shell.
+    def execute(tokens):
+        command_args = parser.parse_args(tokens)
+        if command_args.cmd in ('batch', 'shell'):
+            raise ValueError(f'{command_args.cmd} can not be run from batch or shell')
+        if hasattr(command_args, 'url') and not any(token == '--url' or token.startswith('--url=')
+                                                    for token in tokens):
+            command_args.url = args.url
+        run(parser, command_args, transport)
+
+    return execute
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,502 @@
+import asyncio
+import json
+import ssl
+import time
+
+import aiohttp
+
+from kafka_connect.kafka_connect import State, ApiError, PARALLELISM, _read_connector_status, _check_connector, \
+    _lookup_task_states, _task_status, _connector_states, _name_matcher, _bulk_result, _bulk_error_result, \
+    _iter_task_statuses, _existing_connector, _creation_data, _created_concurrently, _in_target_state, _read_response
+from kafka_connect.transport import EndpointPool, RetryPolicy, RetryBudget, Governor, split_urls, for_call, \
+    request_deadline, is_retryable, may_resend, retry_delay, call_hooks, CONNECT_TIMEOUT, READ_TIMEOUT, POOL_SIZE, \
+    ROUND_ROBIN, COOLDOWN, MAX_FAILURES
+
+
+class Response:
+    __slots__ = ('url', 'status_code', 'headers', 'content')
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncGovernor(Governor):
+    # Asyncio counterpart of Governor, requests wait for limits without blocking event loop.
+    def __init__(self, rate=None, max_reads=None, max_writes=None, adaptive=False, burst=1):
+        super().__init__(rate, max_reads, max_writes, adaptive, burst)
+        self._reads = asyncio.Semaphore(max_reads) if max_reads else None
+        self._writes = asyncio.Semaphore(max_writes) if max_writes else None
+
+    def copy(self):
+        return AsyncGovernor(self.rate, self.max_reads, self.max_writes, self.adaptive, self.burst)
+
+    async def call(self, write, send):
+        start = time.monotonic()
+        semaphore = self._writes if write else self._reads
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            if write:
+                wait = self._try_token()
+                while wait is not None:
+                    await asyncio.sleep(wait)
+                    wait = self._try_token()
+            self._count(time.monotonic() - start)
+            sent = time.monotonic()
+            response = await send()
+            if write and self.adaptive:
+                self._adapt(response.status_code, time.monotonic() - sent)
+            return response
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+
+class AsyncTransport:
+    # Asyncio counterpart of Transport. All requests made through the same instance share one connection pool,
+    # 'pool_size' also limits number of requests in flight.
+    def __init__(self, pool_size=POOL_SIZE, keep_alive=True, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, verify=True, cert=None, auth=None, headers=None, strategy=ROUND_ROBIN,
+                 max_failures=MAX_FAILURES, cooldown=COOLDOWN, retry_policy=None, retry_budget=None, hooks=None,
+                 governor=None):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.verify = verify
+        self.cert = cert
+        self.auth = auth
+        self.headers = headers
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.deadline_at = None
+        self.hooks = list(hooks or [])
+        self.governor = governor
+        self._session = None
+        self._endpoint_pools = {}
+
+    def _ssl_context(self):
+        if self.verify is False:
+            return False
+        if self.verify is True and self.cert is None:
+            return None
+        context = ssl.create_default_context(cafile=self.verify if isinstance(self.verify, str) else None)
+        if isinstance(self.cert, str):
+            context.load_cert_chain(self.cert)
+        elif self.cert is not None:
+            context.load_cert_chain(*self.cert)
+        return context
+
+    @property
+    def session(self):
+        # Session has to be created within running event loop.
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, force_close=not self.keep_alive,
+                                             ssl=self._ssl_context())
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+                auth=aiohttp.BasicAuth(*self.auth) if self.auth is not None else None,
+                headers=self.headers)
+        return self._session
+
+    def endpoints(self, base_url):
+        urls = split_urls(base_url)
+        if urls not in self._endpoint_pools:
+            self._endpoint_pools[urls] = EndpointPool(urls, self.strategy, self.max_failures, self.cooldown)
+        return self._endpoint_pools[urls]
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def for_call(self, backoff_limit=None, delay=None):
+        # Same as Transport.for_call. Session is created before copying, so it is shared by both transports.
+        self.session
+        return for_call(self, backoff_limit, delay)
+
+    async def request(self, method, base_url, path, **kwargs):
+        # Same retry rules as in Transport.request.
+        policy = self.retry_policy
+        deadline_at = request_deadline(policy, self.deadline_at)
+        self.retry_budget.request()
+        timestamp = time.time()
+        start = time.monotonic()
+        attempt = 1
+        response = None
+        error = None
+        try:
+            while True:
+                try:
+                    response = await self._send(method, base_url, path, **kwargs)
+                    if not is_retryable(policy, method, path, response.status_code):
+                        return response
+                    err = None
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if not may_resend(method, isinstance(e, aiohttp.ClientConnectorError)):
+                        raise
+                    response = None
+                    err = e
+                backoff = retry_delay(policy, self.retry_budget, attempt, deadline_at)
+                if backoff is None:
+                    if err is not None:
+                        raise err
+                    return response
+                await asyncio.sleep(backoff)
+                attempt += 1
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            call_hooks(self.hooks, timestamp, method, base_url, path, response, start, attempt - 1, error)
+
+    async def _send(self, method, base_url, path, **kwargs):
+        if self.governor is not None:
+            return await self.governor.call(method != 'GET',
+                                            lambda: self._send_to_endpoints(method, base_url, path, **kwargs))
+        return await self._send_to_endpoints(method, base_url, path, **kwargs)
+
+    async def _send_to_endpoints(self, method, base_url, path, **kwargs):
+        # Same failover rules as in Transport._send_to_endpoints.
+        endpoints = self.endpoints(base_url)
+        read = method == 'GET'
+        err = None
+        for endpoint in endpoints.candidates(read):
+            start = time.monotonic()
+            url = endpoint.url + path
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    result = Response(url, response.status, response.headers, await response.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                endpoints.failed(endpoint)
+                if not may_resend(method, isinstance(e, aiohttp.ClientConnectorError)):
+                    raise
+                err = e
+                continue
+            endpoints.succeeded(endpoint, time.monotonic() - start)
+            return result
+        raise err
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+async def health_check(base_url, verbose=False, transport=None, parallelism=PARALLELISM, backoff_limit=None,
+                       delay=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        exit_code = 0
+        try:
+            for connector_name, connector_status, task_states in await _read_connector_statuses(transport, base_url,
+                                                                                                parallelism):
+                connector = _read_connector_status(connector_name, connector_status, task_states)
+                exit_code = max(exit_code, _check_connector(connector, print if verbose else None))
+        except aiohttp.ClientConnectionError:
+            if verbose:
+                print(f'Connection to {", ".join(split_urls(base_url))} refused')
+            exit_code = 2
+        except Exception as err:
+            if verbose:
+                print(err)
+            exit_code = 3
+        return exit_code
+
+
+async def list_connectors(base_url, transport=None, parallelism=PARALLELISM, backoff_limit=None, delay=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        return [_read_connector_status(connector_name, connector_status, task_states).to_dict()
+                for connector_name, connector_status, task_states in await _read_connector_statuses(transport,
+                                                                                                    base_url,
+                                                                                                    parallelism)]
+
+
+async def create_connector(base_url, connector_name, configuration, if_not_exists=False, backoff_limit=None,
+                           delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        return await _create_connector(transport, base_url, connector_name, configuration, if_not_exists)
+
+
+async def get_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        connector_status = await _get_connector_status(transport, base_url, connector_name)
+        try:
+            connector_info = await _get_connector(transport, base_url, connector_name)
+        except Exception as err:
+            return _read_connector_status(connector_name, connector_status, _raise(err)).to_dict()
+        return _read_connector_status(connector_name, connector_status,
+                                      _lookup_task_states(connector_info, connector_status)).to_dict()
+
+
+async def get_connector_config(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        return await _get_connector_config(transport, base_url, connector_name)
+
+
+async def update_connector(base_url, connector_name, configuration, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        return await _update_connector(transport, base_url, connector_name, configuration)
+
+
+async def restart_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        await _restart_connector(transport, base_url, connector_name)
+
+
+async def delete_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        await _delete_connector(transport, base_url, connector_name)
+
+
+async def pause_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        await _pause_connector(transport, base_url, connector_name)
+
+
+async def resume_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        await _resume_connector(transport, base_url, connector_name)
+
+
+async def delete_all_connectors(base_url, connector_name_pattern, backoff_limit=None, delay=None, verbose=False, *,
+                                transport=None, parallelism=PARALLELISM):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        return await _apply_to_all_connectors(transport, base_url, connector_name_pattern, _delete_connector, None,
+                                              parallelism)
+
+
+async def pause_all_connectors(base_url, connector_name_pattern, backoff_limit=None, delay=None, verbose=False, *,
+                               transport=None, parallelism=PARALLELISM):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        return await _apply_to_all_connectors(transport, base_url, connector_name_pattern, _pause_connector,
+                                              State.PAUSED, parallelism)
+
+
+async def resume_all_connectors(base_url, connector_name_pattern, backoff_limit=None, delay=None, verbose=False, *,
+                                transport=None, parallelism=PARALLELISM):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        return await _apply_to_all_connectors(transport, base_url, connector_name_pattern, _resume_connector,
+                                              State.RUNNING, parallelism)
+
+
+async def list_connector_tasks(base_url, connector_name, transport=None, backoff_limit=None, delay=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        # Check connector first, not status. For some reason API returns status as 'RUNNING' when Kafka is down.
+        await _get_connector(transport, base_url, connector_name)
+        return [task.to_dict()
+                for task in _iter_task_statuses(await _get_connector_status(transport, base_url, connector_name))]
+
+
+async def restart_connector_task(base_url, connector_name, task_id, backoff_limit=None, delay=None, transport=None):
+    async with _TransportScope(transport, backoff_limit, delay) as transport:
+        await _restart_connector_task(transport, base_url, connector_name, task_id)
+
+
+class _TransportScope:
+    # Uses given transport or temporary one, which is closed on exit. Session of aiohttp is bound to event loop,
+    # so unlike sync API there is no transport shared by default.
+    def __init__(self, transport, backoff_limit=None, delay=None):
+        self.transport = transport
+        self.owned = transport is None
+        self.backoff_limit = backoff_limit
+        self.delay = delay
+
+    async def __aenter__(self):
+        if self.owned:
+            self.transport = AsyncTransport()
+        return self.transport.for_call(self.backoff_limit, self.delay)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self.owned:
+            await self.transport.close()
+
+
+async def _read_connector_statuses(transport, base_url, parallelism):
+    # Same as _iter_connector_statuses of sync API. Errors are raised while consuming result in the same order
+    # as if connectors were read one by one.
+    connectors = await _get_expanded_connectors(transport, base_url)
+    if isinstance(connectors, dict):
+        error = await _probe_tasks(transport, base_url, connectors)
+        return [(connector_name, connector['status'],
+                 _lookup_task_states(connector['info'], connector['status']) if error is None else _raise(error))
+                for connector_name, connector in connectors.items()]
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    async def read_task_states(connector_name):
+        # Need to read list of tasks and then check status of each task, even if we can get task id from connector.
+        # For some reason API returns status as 'RUNNING' when Kakfa is down.
+        try:
+            tasks = await bounded(_get_tasks(transport, base_url, connector_name))
+        except Exception as err:
+            return _raise(err)
+        task_statuses = await asyncio.gather(*(bounded(_get_task_status(transport, base_url, connector_name,
+                                                                        task['id']['task']))
+                                               for task in tasks),
+                                             return_exceptions=True)
+        return _replay_task_states(tasks, task_statuses)
+
+    async def read(connector_name):
+        return await asyncio.gather(bounded(_get_connector_status(transport, base_url, connector_name)),
+                                    read_task_states(connector_name),
+                                    return_exceptions=True)
+
+    statuses = await asyncio.gather(*(read(connector_name) for connector_name in connectors))
+    return _replay_connector_statuses(connectors, statuses)
+
+
+def _replay_connector_statuses(connectors, statuses):
+    for connector_name, (connector_status, task_states) in zip(connectors, statuses):
+        if isinstance(connector_status, BaseException):
+            raise connector_status
+        yield connector_name, connector_status, task_states
+
+
+def _replay_task_states(tasks, task_statuses):
+    for task, task_status in zip(tasks, task_statuses):
+        if isinstance(task_status, BaseException):
+            raise task_status
+        yield _task_status(task['id']['task'], task_status)
+
+
+def _raise(err):
+    # Generator of task states which fails on first read, like reading of tasks has failed.
+    raise err
+    yield
+
+
+async def _apply_to_all_connectors(transport, base_url, name_pattern, action, target_state, parallelism):
+    # Same as _apply_to_all_connectors of sync API.
+    name_matcher = _name_matcher(name_pattern)
+    connector_states = await _get_connector_states(transport, base_url)
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+
+    async def apply(connector_name):
+        if _in_target_state(connector_states, connector_name, target_state):
+            return _bulk_result(connector_name, 'skipped')
+        try:
+            async with semaphore:
+                await action(transport, base_url, connector_name)
+        except Exception as err:
+            return _bulk_error_result(connector_name, target_state, err)
+        return _bulk_result(connector_name, 'ok')
+
+    return list(await asyncio.gather(*map(apply, filter(name_matcher.fullmatch, connector_states))))
+
+
+async def _create_connector(transport, base_url, name, configuration, if_not_exists, initial_state=None):
+    # Same as _create_connector of sync API.
+    try:
+        await _get_connector(transport, base_url, name)
+        return _existing_connector(name, if_not_exists)
+    except ApiError as e:
+        if e.status != 404:
+            raise e
+    try:
+        return await _post_json(transport, base_url, '/connectors', _creation_data(name, configuration, initial_state))
+    except ApiError as e:
+        if not _created_concurrently(e, if_not_exists):
+            raise e
+
+
+async def _update_connector(transport, base_url, name, configuration):
+    return await _put_json(transport, base_url, f'/connectors/{name}/config', configuration)
+
+
+async def _restart_connector(transport, base_url, name):
+    await _post_json(transport, base_url, f'/connectors/{name}/restart', None)
+
+
+async def _delete_connector(transport, base_url, name):
+    await _delete(transport, base_url, f'/connectors/{name}')
+
+
+async def _pause_connector(transport, base_url, name):
+    await _put_json(transport, base_url, f'/connectors/{name}/pause', None)
+
+
+async def _resume_connector(transport, base_url, name):
+    await _put_json(transport, base_url, f'/connectors/{name}/resume', None)
+
+
+async def _restart_connector_task(transport, base_url, connector_name, task_id):
+    await _post_json(transport, base_url, f'/connectors/{connector_name}/tasks/{task_id}/restart', None)
+
+
+async def _probe_tasks(transport, base_url, connectors):
+    # Same as _probe_tasks of sync API.
+    for connector_name in connectors:
+        try:
+            await _get_tasks(transport, base_url, connector_name)
+            return None
+        except ApiError as err:
+            if err.status != 404:
+                return err
+        except Exception as err:
+            return err
+    return None
+
+
+async def _get_expanded_connectors(transport, base_url):
+    return await _get_json(transport, base_url, '/connectors?expand=status&expand=info')
+
+
+async def _get_connector_states(transport, base_url):
+    return _connector_states(await _get_json(transport, base_url, '/connectors?expand=status'))
+
+
+async def _get_connector_status(transport, base_url, connector_name):
+    return await _get_json(transport, base_url, f'/connectors/{connector_name}/status')
+
+
+async def _get_connector(transport, base_url, connector_name):
+    return await _get_json(transport, base_url, f'/connectors/{connector_name}')
+
+
+async def _get_connector_config(transport, base_url, connector_name):
+    return await _get_json(transport, base_url, f'/connectors/{connector_name}/config')
+
+
+async def _get_tasks(transport, base_url, connector_name):
+    return await _get_json(transport, base_url, f'/connectors/{connector_name}/tasks')
+
+
+async def _get_task_status(transport, base_url, connector_name, task_id):
+    return await _get_json(transport, base_url, f'/connectors/{connector_name}/tasks/{task_id}/status')
+
+
+async def _get_json(transport, base_url, path):
+    return _read_response('GET', await transport.request('GET', base_url, path))
+
+
+async def _post_json(transport, base_url, path, data):
+    return _read_response('POST', await transport.request('POST', base_url, path, json=data))
+
+
+async def _put_json(transport, base_url, path, data):
+    return _read_response('PUT', await transport.request('PUT', base_url, path, json=data))
+
+
+async def _delete(transport, base_url, path):
+    _read_response('DELETE', await transport.request('DELETE', base_url, path))
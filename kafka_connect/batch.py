@@ -0,0 +1,131 @@
+import cmd
+import io
+import shlex
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _ThreadOutput:
+    # Replaces sys.stdout while commands are run concurrently, so output of each command is collected separately
+    # and printed as a whole in order of commands.
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.buffer = io.StringIO()
+
+    def release(self):
+        buffer = self._local.buffer
+        del self._local.buffer
+        return buffer.getvalue()
+
+    def write(self, text):
+        return getattr(self._local, 'buffer', self.stream).write(text)
+
+    def flush(self):
+        getattr(self._local, 'buffer', self.stream).flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def read_stages(lines):
+    # Each line is command in the same syntax as on command line, without program name. Stages are separated by
+    # blank lines, commands of one stage do not depend on each other. Text after # is comment.
+    stages = [[]]
+    for number, line in enumerate(lines, 1):
+        tokens = shlex.split(line, comments=True)
+        if tokens:
+            stages[-1].append((number, tokens))
+        elif not line.strip() and stages[-1]:
+            stages.append([])
+    return [stage for stage in stages if stage]
+
+
+def run_command(execute, tokens):
+    # Returns exit code of command, errors are printed like uncaught errors of single command.
+    try:
+        execute(tokens)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception as err:
+        print(f'Error: {err}')
+        return 1
+    return 0
+
+
+def run_batch(stages, execute, parallelism=1, keep_going=False):
+    # Runs stages one after another, up to 'parallelism' commands of the same stage concurrently. Output of each
+    # command is printed once it is done, in order of commands. Stops after stage where any command has failed,
+    # unless 'keep_going' is set. Returns the highest exit code of all commands.
+    output = _ThreadOutput(sys.stdout)
+
+    def run_captured(tokens):
+        output.capture()
+        exit_code = run_command(execute, tokens)
+        return exit_code, output.release()
+
+    exit_code = 0
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+            for i, stage in enumerate(stages):
+                stage_exit_code = 0
+                for (number, tokens), (command_exit_code, text) in zip(stage, executor.map(
+                        run_captured, [tokens for _, tokens in stage])):
+                    output.stream.write(text)
+                    output.stream.flush()
+                    if command_exit_code != 0:
+                        print(f'Line {number}: {" ".join(map(shlex.quote, tokens))}: exit code {command_exit_code}',
+                              file=sys.stderr)
+                    stage_exit_code = max(stage_exit_code, command_exit_code)
+                exit_code = max(exit_code, stage_exit_code)
+                if stage_exit_code != 0 and not keep_going and i + 1 < len(stages):
+                    print(f'Skipped {sum(map(len, stages[i + 1:]))} commands of next stages', file=sys.stderr)
+                    break
+    finally:
+        sys.stdout = output.stream
+    return exit_code
+
+
+class Shell(cmd.Cmd):
+    # Interactive shell, each line is command in the same syntax as on command line, without program name.
+    intro = 'Type help for list of commands, exit or Ctrl-D to quit.'
+    prompt = 'kafka_connect> '
+
+    def __init__(self, execute, commands):
+        super().__init__()
+        self.execute = execute
+        self.commands = commands
+
+    def default(self, line):
+        try:
+            tokens = shlex.split(line, comments=True)
+        except ValueError as err:
+            print(f'Error: {err}')
+            return
+        if tokens:
+            exit_code = run_command(self.execute, tokens)
+            if exit_code != 0:
+                print(f'Exit code {exit_code}')
+
+    def emptyline(self):
+        pass
+
+    def do_help(self, arg):
+        self.default(f'{arg} --help' if arg else '--help')
+
+    def do_exit(self, arg):
+        return True
+
+    def do_EOF(self, arg):
+        print()
+        return True
+
+    def completenames(self, text, *ignored):
+        return [command for command in self.commands + ['exit', 'help'] if command.startswith(text)]
@@ -0,0 +1,121 @@
+import operator
+import re
+
+# What has to be read to evaluate condition besides name of connector, from the cheapest to the most expensive.
+CONFIG = 'config'
+STATUS = 'status'
+TASKS = 'tasks'
+
+# Field of condition mapped to what it is read from. 'state' is the state connector is listed with, the worst of
+# states of connector and its tasks, 'connector-state' is state of connector itself, which is cheaper to read.
+FIELDS = {'name': None,
+          'class': CONFIG,
+          'topic': CONFIG,
+          'connector-state': STATUS,
+          'worker': STATUS,
+          'state': TASKS,
+          'failed-tasks': TASKS}
+
+_OPERATORS = {'=': operator.eq, '!=': operator.ne, '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+              '<=': operator.le}
+_CONDITION = re.compile(r'^\s*([a-z-]+)\s*(!=|!~|>=|<=|=|~|>|<)\s*(.*?)\s*$')
+
+
+class Condition:
+    # Condition on one field of connector. '=' and '!=' compare values as they are, '~' and '!~' match them against
+    # regular expression, numeric comparisons are supported by 'failed-tasks' only. Field with many values, like
+    # topics of connector, matches if any of its values matches, negated operators match if none of them does.
+    __slots__ = ('field', 'operator', 'value', '_pattern')
+
+    def __init__(self, field, operator, value):
+        if field not in FIELDS:
+            raise ValueError(f'Unknown field {field}, expected one of: {", ".join(FIELDS)}')
+        if field == 'failed-tasks':
+            if operator in ('~', '!~'):
+                raise ValueError(f'Operator {operator} is not supported by {field}')
+            value = int(value)
+        elif operator not in ('=', '!=', '~', '!~'):
+            raise ValueError(f'Operator {operator} is supported by failed-tasks only')
+        elif field in ('state', 'connector-state'):
+            value = value.upper()
+        self.field = field
+        self.operator = operator
+        self.value = value
+        self._pattern = re.compile(value) if operator in ('~', '!~') else None
+
+    @property
+    def source(self):
+        return FIELDS[self.field]
+
+    def matches(self, connector, config):
+        values = _field_values(self.field, connector, config)
+        if self.field == 'failed-tasks':
+            return _OPERATORS[self.operator](values[0], self.value)
+        if self._pattern is not None:
+            matched = any(self._pattern.fullmatch(value) for value in values)
+        else:
+            matched = any(value == self.value for value in values)
+        return matched if self.operator in ('=', '~') else not matched
+
+    def __str__(self):
+        return f'{self.field}{self.operator}{self.value}'
+
+
+class ConnectorFilter:
+    # Connector matches filter if it matches all conditions. Conditions are evaluated from the cheapest to read, so
+    # connector that does not match is not read any further.
+    def __init__(self, conditions):
+        order = [None, CONFIG, STATUS, TASKS]
+        self.conditions = sorted(conditions, key=lambda condition: order.index(condition.source))
+
+    @property
+    def sources(self):
+        return {condition.source for condition in self.conditions}
+
+    def narrow(self, condition):
+        return ConnectorFilter(self.conditions + [condition])
+
+    def matches(self, connector, config, sources=None):
+        # Only conditions on given sources are evaluated, all of them by default. 'connector' is ConnectorStatus,
+        # it has no state and tasks if they are not read yet.
+        return all(condition.matches(connector, config) for condition in self.conditions
+                   if sources is None or condition.source in sources)
+
+
+def parse_where(expressions):
+    # Each expression is one condition, e.g. state=PAUSED, class~io\.debezium\..* or failed-tasks>0. Returns None if
+    # there are no expressions.
+    if not expressions:
+        return None
+    conditions = []
+    for expression in expressions:
+        match = _CONDITION.match(expression)
+        if match is None:
+            raise ValueError(f'Invalid condition: {expression}')
+        conditions.append(Condition(*match.groups()))
+    return ConnectorFilter(conditions)
+
+
+def name_filter(connector_filter, name_pattern):
+    # Adds pattern of connector name used by bulk commands to filter, so it is checked before anything is read.
+    if name_pattern is None:
+        return connector_filter
+    condition = Condition('name', '~', name_pattern)
+    return ConnectorFilter([condition]) if connector_filter is None else connector_filter.narrow(condition)
+
+
+def _field_values(field, connector, config):
+    if field == 'name':
+        return [connector.name]
+    if field == 'state':
+        return [connector.overall_state.name]
+    if field == 'connector-state':
+        return [connector.state.name]
+    if field == 'worker':
+        return [connector.worker_id or '']
+    if field == 'failed-tasks':
+        return [len(connector.failed_tasks)]
+    if field == 'class':
+        return [config.get('connector.class', '')]
+    # Sink connectors read 'topics', most source connectors write to 'topic'.
+    return [topic.strip() for key in ('topics', 'topic') for topic in config.get(key, '').split(',') if topic.strip()]
@@ -0,0 +1,67 @@
+import json
+import threading
+from collections import defaultdict
+
+
+class RequestStats:
+    # Hook that aggregates requests by method and URL template.
+    def __init__(self):
+        self.endpoints = defaultdict(lambda: {'count': 0, 'errors': 0, 'retries': 0, 'bytes': 0, 'latencies': []})
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            endpoint = self.endpoints[(event.method, event.template)]
+            endpoint['count'] += 1
+            if event.status is None or event.status >= 400:
+                endpoint['errors'] += 1
+            endpoint['retries'] += event.retries
+            endpoint['bytes'] += event.bytes
+            endpoint['latencies'].append(event.latency)
+
+    def summary(self):
+        # Returns one record per endpoint, the slowest endpoints in total go first. Latencies are in milliseconds.
+        with self._lock:
+            records = []
+            for (method, template), endpoint in self.endpoints.items():
+                latencies = sorted(endpoint['latencies'])
+                records.append({'method': method,
+                                'template': template,
+                                'count': endpoint['count'],
+                                'errors': endpoint['errors'],
+                                'retries': endpoint['retries'],
+                                'bytes': endpoint['bytes'],
+                                'total': sum(latencies) * 1000,
+                                'p50': _percentile(latencies, 50) * 1000,
+                                'p90': _percentile(latencies, 90) * 1000,
+                                'p99': _percentile(latencies, 99) * 1000,
+                                'max': latencies[-1] * 1000})
+        return sorted(records, key=lambda record: record['total'], reverse=True)
+
+    def format(self):
+        records = self.summary()
+        width = max([len('ENDPOINT')] + [len(record['template']) for record in records])
+        lines = [f'{"METHOD":<7} {"ENDPOINT":<{width}} {"COUNT":>7} {"ERRORS":>6} {"RETRIES":>7} {"BYTES":>10} '
+                 f'{"P50 ms":>8} {"P90 ms":>8} {"P99 ms":>8} {"MAX ms":>8}']
+        for record in records:
+            lines.append(f'{record["method"]:<7} {record["template"]:<{width}} {record["count"]:>7} '
+                         f'{record["errors"]:>6} {record["retries"]:>7} {record["bytes"]:>10} {record["p50"]:>8.1f} '
+                         f'{record["p90"]:>8.1f} {record["p99"]:>8.1f} {record["max"]:>8.1f}')
+        return '\n'.join(lines)
+
+
+class TraceWriter:
+    # Hook that writes each request as JSON object on separate line, in order requests are completed.
+    def __init__(self, file):
+        self.file = file
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event.to_dict())
+        with self._lock:
+            self.file.write(line + '\n')
+
+
+def _percentile(values, percentile):
+    # Nearest-rank percentile of sorted values.
+    return values[max(0, -(-len(values) * percentile // 100) - 1)]
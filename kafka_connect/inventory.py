@@ -0,0 +1,98 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from kafka_connect.kafka_connect import PARALLELISM, _check_health
+from kafka_connect.transport import Transport, RetryBudget
+
+
+class Cluster:
+    __slots__ = ('name', 'url', 'transport')
+
+    def __init__(self, name, url, transport):
+        self.name = name
+        self.url = url
+        self.transport = transport
+
+
+def read_inventory(path, **transport_options):
+    # Inventory is JSON object that maps name of cluster to its settings:
+    #   {"prod": {"url": "http://worker-1:8083,http://worker-2:8083", "connect_timeout": 2, "read_timeout": 10}}
+    # 'url' is either string or list of URLs. Timeouts, 'max_failures' and 'cooldown' are optional and override ones
+    # in 'transport_options'.
+    with open(path, 'r') as f:
+        inventory = json.load(f)
+    clusters = []
+    for name, settings in inventory.items():
+        options = dict(transport_options)
+        # Retries are limited per cluster, one cluster that is down must not use up retries of others.
+        if 'retry_budget' in options:
+            options['retry_budget'] = RetryBudget(options['retry_budget'].ratio, options['retry_budget'].min_retries)
+        # So is throttling, each cluster has its own leader.
+        if options.get('governor') is not None:
+            options['governor'] = options['governor'].copy()
+        for option in ('connect_timeout', 'read_timeout', 'max_failures', 'cooldown'):
+            if option in settings:
+                options[option] = settings[option]
+        clusters.append(Cluster(name, settings.get('url', settings.get('urls')), Transport(**options)))
+    return clusters
+
+
+def select_clusters(clusters, names):
+    # Selects clusters by comma separated names, 'all' selects all clusters in inventory.
+    if names == 'all':
+        return clusters
+    by_name = {cluster.name: cluster for cluster in clusters}
+    selected = []
+    for name in (name.strip() for name in names.split(',')):
+        if name not in by_name:
+            raise ValueError(f'Cluster {name} is not found in inventory')
+        selected.append(by_name[name])
+    return selected
+
+
+def for_each_cluster(clusters, func):
+    # Calls func(cluster) for all clusters concurrently. Returns (cluster, result, error) for each cluster in the same
+    # order as clusters are given.
+    with ThreadPoolExecutor(max_workers=max(1, len(clusters))) as executor:
+        futures = [executor.submit(func, cluster) for cluster in clusters]
+    results = []
+    for cluster, future in zip(clusters, futures):
+        try:
+            results.append((cluster, future.result(), None))
+        except Exception as err:
+            results.append((cluster, None, err))
+    return results
+
+
+def merge_results(results):
+    # Merges results of all clusters in one list of records, each of them has name of its cluster in 'cluster'.
+    # Cluster that failed is represented by one record with error.
+    records = []
+    for cluster, result, err in results:
+        if err is not None:
+            records.append({'cluster': cluster.name, 'error': str(err)})
+        elif isinstance(result, list):
+            records.extend({'cluster': cluster.name, **record} for record in result)
+        else:
+            records.append({'cluster': cluster.name, **result})
+    return records
+
+
+def health_check_in_clusters(clusters, verbose=False, parallelism=PARALLELISM, connector_filter=None):
+    # Exit code is the worst of exit codes of all clusters. Details are printed grouped by cluster once all
+    # clusters are checked.
+    def check(cluster):
+        messages = []
+        exit_code = _check_health(cluster.transport.for_call(), cluster.url, parallelism, messages.append,
+                                  connector_filter)[0]
+        return exit_code, messages
+
+    exit_code = 0
+    for cluster, result, err in for_each_cluster(clusters, check):
+        # Same exit code as for unexpected error within check of one cluster.
+        cluster_exit_code, messages = result if err is None else (3, [str(err)])
+        if verbose:
+            for message in messages:
+                print(f'[{cluster.name}] {message}')
+        exit_code = max(exit_code, cluster_exit_code)
+    return exit_code
@@ -1,16 +1,39 @@
-import cgi
+import gzip
+import json
 import re
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
 from enum import IntEnum
+from functools import partial
 
-import requests
+from kafka_connect.filters import TASKS, STATUS, CONFIG, name_filter
+from kafka_connect.transport import default_transport, split_urls
 
 
 class State(IntEnum):
+    # Values are kept as they were before RESTARTING was added, use SEVERITY to compare how bad states are.
     UNASSIGNED = 1
     RUNNING = 2
     PAUSED = 3
     FAILED = 4
+    RESTARTING = 5
+
+
+# States from the best to the worst, overall state of connector is the worst of states of connector and its tasks.
+SEVERITY = (State.UNASSIGNED, State.RUNNING, State.RESTARTING, State.PAUSED, State.FAILED)
+
+
+PARALLELISM = 8
+WAIT_TIMEOUT = 60
+POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 5
+# How long connector has to run without tasks before it is considered to have none.
+NO_TASKS_GRACE = 1
+SNAPSHOT_VERSION = 1
+PLUGINS_TTL = 300
 
 
 class ApiError(Exception):
@@ -22,323 +45,1095 @@ class ApiError(Exception):
         return self.message
 
 
-TIMEOUT = 5
+class TaskStatus:
+    __slots__ = ('id', 'state', 'worker_id', 'trace')
+
+    def __init__(self, id, state, worker_id=None, trace=None):
+        self.id = id
+        self.state = state
+        self.worker_id = worker_id
+        self.trace = trace
+
+    def to_dict(self):
+        return {'taskId': self.id, 'state': self.state.name, 'trace': self.trace or ''}
+
+
+class ConnectorStatus:
+    # Status of connector and its tasks. 'state' is state of connector itself, 'overall_state' is the worst of states
+    # of connector and its tasks. 'error' is set if tasks could not be read, then 'tasks' has tasks read before it.
+    __slots__ = ('name', 'state', 'worker_id', 'tasks', 'error')
+
+    def __init__(self, name, state, worker_id=None, tasks=None, error=None):
+        self.name = name
+        self.state = state
+        self.worker_id = worker_id
+        self.tasks = tasks if tasks is not None else []
+        self.error = error
+
+    @property
+    def overall_state(self):
+        if self.error is not None:
+            return State.FAILED
+        return max([self.state] + [task.state for task in self.tasks], key=SEVERITY.index)
+
+    @property
+    def failed_tasks(self):
+        return [task.id for task in self.tasks if task.state == State.FAILED]
+
+    def to_dict(self):
+        return {'connector': self.name, 'state': self.overall_state.name, 'failedTasks': self.failed_tasks}
+
+
+class KafkaConnectClient:
+    # Client of one Kafka connect cluster. It uses given transport or the default one, 'retry_policy', timeouts and
+    # 'governor' override ones of transport without affecting other users of it. Statuses are returned as
+    # ConnectorStatus and TaskStatus, module functions return the same data as plain dicts.
+    def __init__(self, url, transport=None, retry_policy=None, connect_timeout=None, read_timeout=None,
+                 parallelism=PARALLELISM, governor=None):
+        self.url = url
+        self.transport = transport or default_transport()
+        changes = {name: value for name, value in (('retry_policy', retry_policy),
+                                                   ('connect_timeout', connect_timeout),
+                                                   ('read_timeout', read_timeout),
+                                                   ('governor', governor)) if value is not None}
+        if changes:
+            self.transport = self.transport.replace(**changes)
+        self.parallelism = parallelism
+
+    def health_check(self, verbose=False, parallelism=None, backoff_limit=None, delay=None, connector_filter=None):
+        return _check_health(self._call(backoff_limit, delay), self.url, parallelism or self.parallelism,
+                             print if verbose else None, connector_filter)[0]
+
+    def list_connectors(self, parallelism=None, backoff_limit=None, delay=None, connector_filter=None):
+        return list(self.iter_connectors(parallelism, backoff_limit, delay, connector_filter))
+
+    def iter_connectors(self, parallelism=None, backoff_limit=None, delay=None, connector_filter=None):
+        # Same as list_connectors, but yields each connector as soon as it is read.
+        yield from _iter_connector_statuses(self._call(backoff_limit, delay), self.url,
+                                            parallelism or self.parallelism, connector_filter)
+
+    def create_connector(self, connector_name, configuration, if_not_exists=False, backoff_limit=None, delay=None):
+        return _create_connector(self._call(backoff_limit, delay), self.url, connector_name, configuration,
+                                 if_not_exists)
+
+    def get_connector(self, connector_name, backoff_limit=None, delay=None):
+        transport = self._call(backoff_limit, delay)
+        connector_status = _get_connector_status(transport, self.url, connector_name)
+
+        def task_states():
+            yield from _lookup_task_states(_get_connector(transport, self.url, connector_name), connector_status)
+
+        return _read_connector_status(connector_name, connector_status, task_states())
+
+    def get_connector_config(self, connector_name, backoff_limit=None, delay=None):
+        return _get_connector_config(self._call(backoff_limit, delay), self.url, connector_name)
+
+    def update_connector(self, connector_name, configuration, backoff_limit=None, delay=None):
+        return _update_connector(self._call(backoff_limit, delay), self.url, connector_name, configuration)
+
+    def restart_connector(self, connector_name, backoff_limit=None, delay=None):
+        _restart_connector(self._call(backoff_limit, delay), self.url, connector_name)
+
+    def delete_connector(self, connector_name, backoff_limit=None, delay=None):
+        _delete_connector(self._call(backoff_limit, delay), self.url, connector_name)
+
+    def pause_connector(self, connector_name, backoff_limit=None, delay=None):
+        _pause_connector(self._call(backoff_limit, delay), self.url, connector_name)
+
+    def resume_connector(self, connector_name, backoff_limit=None, delay=None):
+        _resume_connector(self._call(backoff_limit, delay), self.url, connector_name)
+
+    def delete_all_connectors(self, connector_name_pattern, backoff_limit=None, delay=None, parallelism=None,
+                              connector_filter=None):
+        return _apply_to_all_connectors(self._call(backoff_limit, delay), self.url, connector_name_pattern,
+                                        _delete_connector, None, parallelism or self.parallelism,
+                                        connector_filter)
+
+    def pause_all_connectors(self, connector_name_pattern, backoff_limit=None, delay=None, parallelism=None,
+                             connector_filter=None):
+        return _apply_to_all_connectors(self._call(backoff_limit, delay), self.url, connector_name_pattern,
+                                        _pause_connector, State.PAUSED, parallelism or self.parallelism,
+                                        connector_filter)
+
+    def resume_all_connectors(self, connector_name_pattern, backoff_limit=None, delay=None, parallelism=None,
+                              connector_filter=None):
+        return _apply_to_all_connectors(self._call(backoff_limit, delay), self.url, connector_name_pattern,
+                                        _resume_connector, State.RUNNING, parallelism or self.parallelism,
+                                        connector_filter)
+
+    def apply_connectors(self, configurations, prune=False, dry_run=False, backoff_limit=None, delay=None,
+                         parallelism=None):
+        return _apply_connectors(self._call(backoff_limit, delay), self.url, configurations, prune, dry_run,
+                                 parallelism or self.parallelism)
+
+    def list_connector_tasks(self, connector_name, backoff_limit=None, delay=None):
+        return list(self.iter_connector_tasks(connector_name, backoff_limit, delay))
+
+    def iter_connector_tasks(self, connector_name, backoff_limit=None, delay=None):
+        yield from _iter_connector_tasks(self._call(backoff_limit, delay), self.url, connector_name)
+
+    def restart_connector_task(self, connector_name, task_id, backoff_limit=None, delay=None):
+        _restart_connector_task(self._call(backoff_limit, delay), self.url, connector_name, task_id)
+
+    def restart_failed_tasks(self, connector_name_pattern=None, wait=False, timeout=WAIT_TIMEOUT, backoff_limit=None,
+                             delay=None, parallelism=None):
+        return _restart_failed_tasks(self._call(backoff_limit, delay), self.url, connector_name_pattern, wait,
+                                     timeout, parallelism or self.parallelism)
+
+    def wait_for_connectors(self, connector_names=None, connector_name_pattern=None, state=State.RUNNING,
+                            timeout=WAIT_TIMEOUT, backoff_limit=None, delay=None, parallelism=None):
+        return _wait_for_connectors(self._call(backoff_limit, delay), self.url, connector_names,
+                                    connector_name_pattern, state, timeout, parallelism or self.parallelism)
+
+    def snapshot_connectors(self, connector_name_pattern=None, include_state=False, include_offsets=False,
+                            backoff_limit=None, delay=None, parallelism=None):
+        return _snapshot_connectors(self._call(backoff_limit, delay), self.url, connector_name_pattern,
+                                    include_state, include_offsets, parallelism or self.parallelism)
+
+    def restore_connectors(self, snapshot, connector_name_pattern=None, restore_state=False, dry_run=False,
+                           backoff_limit=None, delay=None, parallelism=None):
+        return _restore_connectors(self._call(backoff_limit, delay), self.url, snapshot, connector_name_pattern,
+                                   restore_state, dry_run, parallelism or self.parallelism)
+
+    def validate_connectors(self, configurations, backoff_limit=None, delay=None, parallelism=None):
+        return _validate_connectors(self._call(backoff_limit, delay), self.url, configurations,
+                                    parallelism or self.parallelism)
+
+    def _call(self, backoff_limit, delay):
+        # Each request is retried by transport according to its retry policy, 'backoff_limit' (number of attempts)
+        # and 'delay' (base delay between attempts in seconds) override it for one call.
+        return self.transport.for_call(backoff_limit, delay)
+
+
+def health_check(base_url, verbose=False, transport=None, parallelism=PARALLELISM, backoff_limit=None, delay=None,
+                 connector_filter=None):
+    return KafkaConnectClient(base_url, transport).health_check(verbose, parallelism, backoff_limit, delay,
+                                                                connector_filter)
+
+
+def list_connectors(base_url, transport=None, parallelism=PARALLELISM, backoff_limit=None, delay=None,
+                    connector_filter=None):
+    return list(iter_connectors(base_url, transport, parallelism, backoff_limit, delay, connector_filter))
+
+
+def iter_connectors(base_url, transport=None, parallelism=PARALLELISM, backoff_limit=None, delay=None,
+                    connector_filter=None):
+    # Same as list_connectors, but yields each connector as soon as it is read.
+    for connector in KafkaConnectClient(base_url, transport).iter_connectors(parallelism, backoff_limit, delay,
+                                                                             connector_filter):
+        yield connector.to_dict()
+
+
+def create_connector(base_url, connector_name, configuration, if_not_exists=False, backoff_limit=None, delay=None,
+                     transport=None):
+    return KafkaConnectClient(base_url, transport).create_connector(connector_name, configuration, if_not_exists,
+                                                                    backoff_limit, delay)
+
+
+def get_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    return KafkaConnectClient(base_url, transport).get_connector(connector_name, backoff_limit, delay).to_dict()
+
+
+def get_connector_config(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    return KafkaConnectClient(base_url, transport).get_connector_config(connector_name, backoff_limit, delay)
+
+
+def update_connector(base_url, connector_name, configuration, backoff_limit=None, delay=None, transport=None):
+    return KafkaConnectClient(base_url, transport).update_connector(connector_name, configuration, backoff_limit,
+                                                                    delay)
+
+
+def restart_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    KafkaConnectClient(base_url, transport).restart_connector(connector_name, backoff_limit, delay)
+
+
+def delete_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    KafkaConnectClient(base_url, transport).delete_connector(connector_name, backoff_limit, delay)
+
+
+def pause_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    KafkaConnectClient(base_url, transport).pause_connector(connector_name, backoff_limit, delay)
+
+
+def resume_connector(base_url, connector_name, backoff_limit=None, delay=None, transport=None):
+    KafkaConnectClient(base_url, transport).resume_connector(connector_name, backoff_limit, delay)
+
+
+def delete_all_connectors(base_url, connector_name_pattern, backoff_limit=None, delay=None, verbose=False, *,
+                          transport=None, parallelism=PARALLELISM, connector_filter=None):
+    # 'verbose' has no effect, it is kept so that positional calls still work. Report is returned instead.
+    return KafkaConnectClient(base_url, transport).delete_all_connectors(connector_name_pattern, backoff_limit,
+                                                                         delay, parallelism, connector_filter)
+
+
+def pause_all_connectors(base_url, connector_name_pattern, backoff_limit=None, delay=None, verbose=False, *,
+                         transport=None, parallelism=PARALLELISM, connector_filter=None):
+    return KafkaConnectClient(base_url, transport).pause_all_connectors(connector_name_pattern, backoff_limit, delay,
+                                                                        parallelism, connector_filter)
+
+
+def resume_all_connectors(base_url, connector_name_pattern, backoff_limit=None, delay=None, verbose=False, *,
+                          transport=None, parallelism=PARALLELISM, connector_filter=None):
+    return KafkaConnectClient(base_url, transport).resume_all_connectors(connector_name_pattern, backoff_limit,
+                                                                         delay, parallelism, connector_filter)
+
+
+def apply_connectors(base_url, configurations, prune=False, dry_run=False, backoff_limit=None, delay=None,
+                     transport=None, parallelism=PARALLELISM):
+    return KafkaConnectClient(base_url, transport).apply_connectors(configurations, prune, dry_run, backoff_limit,
+                                                                    delay, parallelism)
+
+
+def list_connector_tasks(base_url, connector_name, transport=None, backoff_limit=None, delay=None):
+    return list(iter_connector_tasks(base_url, connector_name, transport, backoff_limit, delay))
+
+
+def iter_connector_tasks(base_url, connector_name, transport=None, backoff_limit=None, delay=None):
+    for task in KafkaConnectClient(base_url, transport).iter_connector_tasks(connector_name, backoff_limit, delay):
+        yield task.to_dict()
+
+
+def restart_connector_task(base_url, connector_name, task_id, backoff_limit=None, delay=None, transport=None):
+    KafkaConnectClient(base_url, transport).restart_connector_task(connector_name, task_id, backoff_limit, delay)
+
+
+def restart_failed_tasks(base_url, connector_name_pattern=None, wait=False, timeout=WAIT_TIMEOUT, backoff_limit=None,
+                         delay=None, transport=None, parallelism=PARALLELISM):
+    return KafkaConnectClient(base_url, transport).restart_failed_tasks(connector_name_pattern, wait, timeout,
+                                                                        backoff_limit, delay, parallelism)
+
+
+def wait_for_connectors(base_url, connector_names=None, connector_name_pattern=None, state=State.RUNNING,
+                        timeout=WAIT_TIMEOUT, backoff_limit=None, delay=None, transport=None, parallelism=PARALLELISM):
+    return KafkaConnectClient(base_url, transport).wait_for_connectors(connector_names, connector_name_pattern, state,
+                                                                       timeout, backoff_limit, delay, parallelism)
+
+
+def snapshot_connectors(base_url, connector_name_pattern=None, include_state=False, include_offsets=False,
+                        backoff_limit=None, delay=None, transport=None, parallelism=PARALLELISM):
+    return KafkaConnectClient(base_url, transport).snapshot_connectors(connector_name_pattern, include_state,
+                                                                       include_offsets, backoff_limit, delay,
+                                                                       parallelism)
+
+
+def restore_connectors(base_url, snapshot, connector_name_pattern=None, restore_state=False, dry_run=False,
+                       backoff_limit=None, delay=None, transport=None, parallelism=PARALLELISM):
+    return KafkaConnectClient(base_url, transport).restore_connectors(snapshot, connector_name_pattern,
+                                                                      restore_state, dry_run, backoff_limit, delay,
+                                                                      parallelism)
+
+
+def validate_connectors(base_url, configurations, backoff_limit=None, delay=None, transport=None,
+                        parallelism=PARALLELISM):
+    return KafkaConnectClient(base_url, transport).validate_connectors(configurations, backoff_limit, delay,
+                                                                       parallelism)
+
+
+def write_snapshot(snapshot, file):
+    # Snapshot is written as gzip compressed JSON, 'file' is either path or binary file object.
+    with gzip.open(file, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f)
 
 
-def health_check(base_url, verbose=False):
+def read_snapshot(file):
+    with gzip.open(file, 'rt', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    version = snapshot.get('version') if isinstance(snapshot, dict) else None
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f'Unsupported version of snapshot: {version}')
+    return snapshot
+
+
+def _iter_connector_statuses(transport, base_url, parallelism, connector_filter=None, read_tasks=True):
+    # Yields ConnectorStatus of each connector that matches filter. Statuses of all connectors are read with single
+    # request if worker supports it, otherwise they are read concurrently with at most 'parallelism' requests
+    # in flight. Connectors are yielded in order they are listed by worker regardless of when their statuses arrive.
+    # Only few connectors are read ahead of consumer, so results are not piled up in memory when consumer is slow.
+    # Without 'read_tasks' tasks are read only if filter needs them, state is None if status is not read either.
+    connectors = _get_expanded_connectors(transport, base_url)
+    if isinstance(connectors, dict):
+        error = _probe_tasks(transport, base_url, connectors)
+        for connector_name, connector in connectors.items():
+            connector_status = _read_connector_status(connector_name, connector['status'],
+                                                      _lookup_task_states(connector['info'], connector['status']))
+            if error is not None:
+                connector_status.error = error
+            # Connector which tasks could not be read is not filtered by them, so that its error is not lost.
+            if connector_filter is None or \
+                    connector_filter.matches(connector_status, connector['info']['config'],
+                                             None if connector_status.error is None else {None, CONFIG, STATUS}):
+                yield connector_status
+        return
+    connector_statuses = {}
+    if connector_filter is not None:
+        connectors, connector_statuses = _select_connectors(transport, base_url, connectors, connector_filter,
+                                                            parallelism)
+    if not read_tasks and (connector_filter is None or TASKS not in connector_filter.sources):
+        for connector_name in connectors:
+            connector_status = connector_statuses.get(connector_name)
+            yield _read_connector_status(connector_name, connector_status, ()) if connector_status is not None \
+                else ConnectorStatus(connector_name, None)
+        return
+    read_ahead = 2 * max(1, parallelism)
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        futures = deque()
+
+        def read(connector_name, connector_status, task_states):
+            connector_status = _read_connector_status(connector_name, connector_status.result(),
+                                                      _collect_task_states(task_states))
+            if connector_filter is None or connector_status.error is not None or \
+                    connector_filter.matches(connector_status, None, {TASKS}):
+                return connector_status
+            return None
+
+        for connector_name in connectors:
+            futures.append((connector_name,
+                            _submit_connector_status(executor, transport, base_url, connector_name,
+                                                     connector_statuses.pop(connector_name, None)),
+                            _submit_task_states(executor, transport, base_url, connector_name)))
+            if len(futures) >= read_ahead:
+                connector_status = read(*futures.popleft())
+                if connector_status is not None:
+                    yield connector_status
+        while futures:
+            connector_status = read(*futures.popleft())
+            if connector_status is not None:
+                yield connector_status
+
+
+def _probe_tasks(transport, base_url, connectors):
+    # Expanded listing is answered from snapshots the worker keeps in memory, it shows connectors and tasks RUNNING
+    # even when Kafka is down. List of tasks is read by the thread that handles requests, which is stuck then, so
+    # tasks of one connector are read to check that snapshot can be trusted. Returns error of reading them, it applies
+    # to all connectors just like errors of reading tasks of each connector do. Connector deleted meanwhile is skipped.
+    for connector_name in connectors:
+        try:
+            _get_tasks(transport, base_url, connector_name)
+            return None
+        except ApiError as err:
+            if err.status != 404:
+                return err
+        except Exception as err:
+            return err
+    return None
+
+
+def _select_connectors(transport, base_url, connector_names, connector_filter, parallelism):
+    # Evaluates conditions of filter that do not need tasks, reading configurations and statuses of connectors only
+    # if conditions need them, and only while connector still matches. Returns names of matching connectors in the
+    # same order and statuses that have been read, mapped by name. Connector deleted meanwhile does not match.
+    connector_names = [connector_name for connector_name in connector_names
+                       if connector_filter.matches(ConnectorStatus(connector_name, None), None, {None})]
+    sources = connector_filter.sources
+
+    def select(connector_name):
+        try:
+            if CONFIG in sources:
+                config = _get_connector_config(transport, base_url, connector_name)
+                if not connector_filter.matches(ConnectorStatus(connector_name, None), config, {CONFIG}):
+                    return False, None
+            if STATUS in sources:
+                connector_status = _get_connector_status(transport, base_url, connector_name)
+                if not connector_filter.matches(_read_connector_status(connector_name, connector_status, ()), None,
+                                                {STATUS}):
+                    return False, None
+                return True, connector_status
+        except ApiError as err:
+            if err.status == 404:
+                return False, None
+            raise
+        return True, None
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        selected = list(zip(connector_names, executor.map(select, connector_names)))
+    return ([connector_name for connector_name, (matches, _) in selected if matches],
+            {connector_name: connector_status for connector_name, (matches, connector_status) in selected
+             if connector_status is not None})
+
+
+def _submit_connector_status(executor, transport, base_url, connector_name, connector_status):
+    # Status that is already read is not read again.
+    if connector_status is None:
+        return executor.submit(_get_connector_status, transport, base_url, connector_name)
+    future = Future()
+    future.set_result(connector_status)
+    return future
+
+
+def _read_connector_status(connector_name, connector_status, task_states):
+    # All statuses are read here from status of connector and TaskStatus of each of its tasks. Error of reading tasks
+    # is kept in status, so it fails only consumers that need all tasks.
+    connector = ConnectorStatus(connector_name, State[connector_status['connector']['state']],
+                                connector_status['connector'].get('worker_id'))
+    try:
+        for task in task_states:
+            connector.tasks.append(task)
+    except Exception as err:
+        connector.error = err
+    return connector
+
+
+def _check_health(transport, base_url, parallelism, log, connector_filter=None):
+    # Returns exit code of health check along with ConnectorStatus of each checked connector. Check stops on first
+    # error, so connectors are complete only when exit code is 0 or 1. Details of check are passed to 'log' function
+    # if it is set.
+    import requests
+
     exit_code = 0
+    connectors = []
     try:
-        for connector_name in _get_connectors(base_url):
-            connector_status = _get_connector_status(base_url, connector_name)
-            connector_state = State[connector_status['connector']['state']]
-            if verbose:
-                print(f'Connector {connector_name} in state {connector_state.name}')
-            if connector_state != State.RUNNING and connector_state != State.PAUSED:
-                exit_code = 1
-            # Need to read list of tasks and then check status of each task, even if we can get task id from connector.
-            # For some reason API returns status as 'RUNNING' when Kakfa is down.
-            for task_id in map(lambda t: t['id']['task'], _get_tasks(base_url, connector_name)):
-                task = _get_task_status(base_url, connector_name, task_id)
-                task_state = State[task['state']]
-                if task_state != State.RUNNING and task_state != State.PAUSED:
-                    if verbose:
-                        print(f'Task {task_id} of connector {connector_name} in state {task["state"]}')
-                    exit_code = 1
+        for connector in _iter_connector_statuses(transport, base_url, parallelism, connector_filter):
+            exit_code = max(exit_code, _check_connector(connector, log))
+            connectors.append(connector)
     except requests.ConnectionError:
-        if verbose:
-            print(f'Connection to {base_url} refused')
+        if log:
+            log(f'Connection to {", ".join(split_urls(base_url))} refused')
         exit_code = 2
     except Exception as err:
-        if verbose:
-            print(err)
+        if log:
+            log(str(err))
         exit_code = 3
+    return exit_code, connectors
+
+
+def _check_connector(connector, log):
+    exit_code = 0
+    if log:
+        log(f'Connector {connector.name} in state {connector.state.name}')
+    if connector.state != State.RUNNING and connector.state != State.PAUSED:
+        exit_code = 1
+    for task in connector.tasks:
+        if task.state != State.RUNNING and task.state != State.PAUSED:
+            if log:
+                log(f'Task {task.id} of connector {connector.name} in state {task.state.name}')
+            exit_code = 1
+    if connector.error is not None:
+        raise connector.error
     return exit_code
 
 
-def list_connectors(base_url):
-    return _list_connectors(base_url)
+def _submit_task_states(executor, transport, base_url, connector_name):
+    # Need to read list of tasks and then check status of each task, even if we can get task id from connector.
+    # For some reason API returns status as 'RUNNING' when Kakfa is down.
+    # Statuses of tasks are submitted as soon as list of tasks is read. Workers never wait for other futures,
+    # so this does not block executor.
+    def submit_task_statuses():
+        return [(task['id']['task'],
+                 executor.submit(_get_task_status, transport, base_url, connector_name, task['id']['task']))
+                for task in _get_tasks(transport, base_url, connector_name)]
 
+    return executor.submit(submit_task_statuses)
 
-def create_connector(base_url, connector_name, configuration, if_not_exists=False, backoff_limit=1, delay=0):
-    return _retry(lambda: _create_connector(base_url, connector_name, configuration, if_not_exists),
-                  lambda err: isinstance(err, requests.ConnectionError),
-                  backoff_limit,
-                  delay)
 
+def _collect_task_states(task_states):
+    # Errors are raised in the same order as if tasks were read one by one.
+    for task_id, task_status in task_states.result():
+        yield _task_status(task_id, task_status.result())
+
+
+def _lookup_task_states(connector_info, connector_status):
+    # Same as _collect_task_states but with data that is already loaded. List of tasks is taken from connector info,
+    # status is used only to look up state of each task. Task without status fails just like request of its status.
+    task_statuses = {task['id']: task for task in connector_status['tasks']}
+    for task in connector_info['tasks']:
+        yield _task_status(task['task'], task_statuses[task['task']])
 
-def get_connector(base_url, connector_name, backoff_limit=1, delay=0):
-    def get_connector_func():
-        connector_status = _get_connector_status(base_url, connector_name)
-        connector_state = State[connector_status['connector']['state']]
-        failed_tasks = []
-        try:
-            for task in _get_tasks(base_url, connector_name):
-                task_id = task['id']['task']
-                task = _get_task_status(base_url, connector_name, task_id)
-                task_state = State[task['state']]
-                if task_state == State.FAILED:
-                    failed_tasks.append(task_id)
-                if task_state > connector_state:
-                    connector_state = task_state
-        except Exception:
-            connector_state = State.FAILED
-        return {'connector': connector_name, 'state': connector_state.name, 'failedTasks': failed_tasks}
 
-    return _retry(get_connector_func,
-                  lambda err: isinstance(err, requests.ConnectionError),
-                  backoff_limit,
-                  delay)
+def _task_status(task_id, task_status):
+    # Traces are left out, they are big and are needed only when tasks of one connector are listed.
+    return TaskStatus(task_id, State[task_status['state']], task_status.get('worker_id'))
 
 
-def get_connector_config(base_url, connector_name, backoff_limit=1, delay=0):
-    return _retry(lambda: _get_connector_config(base_url, connector_name),
-                  lambda err: isinstance(err, requests.ConnectionError),
-                  backoff_limit,
-                  delay)
+def _create_connector(transport, base_url, name, configuration, if_not_exists, initial_state=None):
+    # 'initial_state' is supported by workers since 3.7, older ones create connector running.
+    try:
+        _get_connector(transport, base_url, name)
+        return _existing_connector(name, if_not_exists)
+    except ApiError as e:
+        if e.status != 404:
+            raise e
+    try:
+        return _post_json(transport, base_url, '/connectors', _creation_data(name, configuration, initial_state))
+    except ApiError as e:
+        if not _created_concurrently(e, if_not_exists):
+            raise e
+
 
+def _existing_connector(name, if_not_exists):
+    if not if_not_exists:
+        raise RuntimeError(f'Connector {name} already exists')
+    return None
 
-def update_connector(base_url, connector_name, configuration, backoff_limit=1, delay=0):
-    return _retry(lambda: _update_connector(base_url, connector_name, configuration),
-                  lambda err: isinstance(err, requests.ConnectionError),
-                  backoff_limit,
-                  delay)
 
+def _creation_data(name, configuration, initial_state):
+    data = {'name': name, 'config': configuration}
+    if initial_state is not None:
+        data['initial_state'] = initial_state.name
+    return data
 
-def restart_connector(base_url, connector_name, backoff_limit=1, delay=0):
-    _retry(lambda: _restart_connector(base_url, connector_name),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+def _created_concurrently(err, if_not_exists):
+    # Created by someone else since it was read.
+    return err.status == 409 and if_not_exists
+
+
+def _update_connector(transport, base_url, name, configuration):
+    return _put_json(transport, base_url, f'/connectors/{name}/config', configuration)
+
+
+def _restart_connector(transport, base_url, name, include_tasks=False, only_failed=False):
+    # Workers older than 3.0 ignore parameters and restart connector only.
+    if include_tasks or only_failed:
+        _post_json(transport, base_url, f'/connectors/{name}/restart?includeTasks={str(include_tasks).lower()}'
+                                        f'&onlyFailed={str(only_failed).lower()}', None)
+    else:
+        _post_json(transport, base_url, f'/connectors/{name}/restart', None)
+
+
+def _delete_connector(transport, base_url, name):
+    _delete(transport, base_url, f'/connectors/{name}')
+
+
+def _pause_connector(transport, base_url, name):
+    _put_json(transport, base_url, f'/connectors/{name}/pause', None)
+
+
+def _resume_connector(transport, base_url, name):
+    _put_json(transport, base_url, f'/connectors/{name}/resume', None)
+
+
+def _apply_to_all_connectors(transport, base_url, name_pattern, action, target_state, parallelism,
+                             connector_filter=None):
+    # Applies action to each connector which name matches pattern and returns result for each of them. Connectors
+    # that are already in target state in snapshot taken before any change are skipped. Requests are retried
+    # separately, so error on one connector does not repeat work already done for others. With filter only
+    # connectors that match it are changed, they are read no further than filter needs.
+    name_matcher = _name_matcher(name_pattern)
+    if connector_filter is None:
+        connector_states = _get_connector_states(transport, base_url)
+    else:
+        connector_states = {connector.name: connector.state
+                            for connector in _iter_connector_statuses(transport, base_url, parallelism,
+                                                                      name_filter(connector_filter, name_pattern),
+                                                                      False)}
+
+    def apply(connector_name):
+        if _in_target_state(connector_states, connector_name, target_state):
+            return _bulk_result(connector_name, 'skipped')
+        try:
+            action(transport, base_url, connector_name)
+        except Exception as err:
+            return _bulk_error_result(connector_name, target_state, err)
+        return _bulk_result(connector_name, 'ok')
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        return list(executor.map(apply, filter(name_matcher.fullmatch, connector_states)))
+
+
+def _apply_connectors(transport, base_url, configurations, prune, dry_run, parallelism, initial_states=None):
+    # Brings connectors to configurations given as mapping of connector name to its configuration. Only connectors
+    # which configuration differs from current one are written. With 'prune' connectors that are not in
+    # configurations are deleted. Connectors are created in state given in 'initial_states' by name, if any.
+    # Returns planned action and its result for each connector.
+    current_configurations = _get_connector_configs(transport, base_url, configurations, parallelism)
+    plan = []
+    for connector_name, configuration in configurations.items():
+        desired = _normalize_config(connector_name, configuration)
+        if connector_name not in current_configurations:
+            plan.append((connector_name, 'create', _config_changes({}, desired)))
+        else:
+            changes = _config_changes(current_configurations[connector_name], desired)
+            plan.append((connector_name, 'update' if changes else 'unchanged', changes))
+    if prune:
+        plan.extend((connector_name, 'delete', {}) for connector_name in current_configurations
+                    if connector_name not in configurations)
+
+    def apply(step):
+        connector_name, action, changes = step
+        report = {'connector': connector_name, 'action': action, 'changes': changes, 'result': None, 'error': None}
+        if dry_run:
+            return report
+        if action == 'unchanged':
+            report['result'] = 'skipped'
+            return report
+        if action == 'create':
+            write = partial(_create_connector, transport, base_url, connector_name, configurations[connector_name],
+                            False, (initial_states or {}).get(connector_name))
+        elif action == 'update':
+            write = partial(_update_connector, transport, base_url, connector_name, configurations[connector_name])
+        else:
+            write = partial(_delete_connector, transport, base_url, connector_name)
+        try:
+            write()
+            report['result'] = 'ok'
+        except Exception as err:
+            report['result'] = 'failed'
+            report['error'] = str(err)
+        return report
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        return list(executor.map(apply, plan))
+
+
+def _restart_failed_tasks(transport, base_url, name_pattern, wait, timeout, parallelism):
+    # Restarts failed connectors and failed tasks of connectors which name matches pattern, found in one snapshot of
+    # statuses. Workers since 3.0 restart all of them with one request per connector, for older ones connector and
+    # each task are restarted separately. With 'wait' restarted connectors are polled until they and their restarted
+    # tasks are running, or paused if connector was paused in snapshot, connector that does not get there in
+    # 'timeout' seconds is reported as failed.
+    name_matcher = _name_matcher(name_pattern)
+    restart_with_tasks = _version_at_least(_get_worker_version(transport, base_url), (3, 0))
+    targets = []
+    target_states = {}
+    for connector in _iter_connector_statuses(transport, base_url, parallelism):
+        if not name_matcher.fullmatch(connector.name):
+            continue
+        target_states[connector.name] = State.PAUSED if connector.state == State.PAUSED else State.RUNNING
+        connector_failed = connector.state == State.FAILED
+        if connector.error is not None:
+            targets.append((connector.name, connector_failed, [], connector.error))
+        elif connector_failed or connector.failed_tasks:
+            targets.append((connector.name, connector_failed, connector.failed_tasks, None))
+
+    def restart(target):
+        connector_name, connector_failed, failed_tasks, err = target
+        if err is not None:
+            return _restart_result(connector_name, failed_tasks, 'failed', str(err))
+        try:
+            if restart_with_tasks:
+                _restart_connector(transport, base_url, connector_name, include_tasks=True, only_failed=True)
+            else:
+                if connector_failed:
+                    _restart_connector(transport, base_url, connector_name)
+                for task_id in failed_tasks:
+                    _restart_connector_task(transport, base_url, connector_name, task_id)
+        except Exception as err:
+            return _restart_result(connector_name, failed_tasks, 'failed', str(err))
+        return _restart_result(connector_name, failed_tasks, 'ok')
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        results = list(executor.map(restart, targets))
+    if wait:
+        restarted = {result['connector']: result['tasks'] for result in results if result['result'] == 'ok'}
+        deadline = time.monotonic() + timeout
+
+        def poll(connector_name):
+            task_ids = restarted[connector_name]
+            try:
+                connector_status = _get_connector_status(transport, base_url, connector_name)
+            except Exception:
+                return None
+            task_states = {task.id: task.state for task in _iter_task_statuses(connector_status)}
+            states = [State[connector_status['connector']['state']]] + [task_states.get(task_id)
+                                                                        for task_id in task_ids]
+            if all(state == target_states[connector_name] for state in states):
+                return _restart_result(connector_name, task_ids, 'ok')
+            if State.FAILED in states:
+                return _restart_result(connector_name, task_ids, 'failed', 'Failed again after restart')
+            return None
+
+        polled = _poll(list(restarted), poll, deadline, parallelism, False)
+        results = [polled.get(result['connector'], _restart_result(result['connector'], result['tasks'], 'failed',
+                                                                    'Not started after restart'))
+                   if result['connector'] in restarted else result
+                   for result in results]
+    return results
+
+
+def _snapshot_connectors(transport, base_url, name_pattern, include_state, include_offsets, parallelism):
+    # Reads configuration and, optionally, state and offsets of each connector which name matches pattern.
+    # Configurations and states of all connectors are read with single request if worker supports it, otherwise
+    # they are read concurrently like offsets, which are read one connector at a time (workers since 3.5 only).
+    # Connector deleted while snapshot is taken is left out.
+    name_matcher = _name_matcher(name_pattern)
+    worker_version = _get_worker_version(transport, base_url)
+    include_offsets = include_offsets and _version_at_least(worker_version, (3, 5))
+    connectors = _get_expanded_connectors(transport, base_url)
+    connector_names = [connector_name for connector_name in connectors if name_matcher.fullmatch(connector_name)]
+
+    def read(connector_name):
+        try:
+            if isinstance(connectors, dict):
+                connector = {'config': connectors[connector_name]['info']['config']}
+                connector_state = connectors[connector_name]['status']['connector']['state']
+            else:
+                connector = {'config': _get_connector_config(transport, base_url, connector_name)}
+                connector_state = _get_connector_status(transport, base_url, connector_name)['connector']['state'] \
+                    if include_state else None
+            if include_state:
+                connector['state'] = connector_state
+            if include_offsets:
+                connector['offsets'] = _get_connector_offsets(transport, base_url, connector_name)['offsets']
+        except ApiError as err:
+            if err.status == 404:
+                return None
+            raise
+        return connector
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        snapshot_connectors = {connector_name: connector
+                               for connector_name, connector in zip(connector_names,
+                                                                    executor.map(read, connector_names))
+                               if connector is not None}
+    return {'version': SNAPSHOT_VERSION,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'workerVersion': worker_version,
+            'connectors': snapshot_connectors}
+
+
+def _restore_connectors(transport, base_url, snapshot, name_pattern, restore_state, dry_run, parallelism):
+    # Creates or updates connectors which name matches pattern to configurations in snapshot, like apply does.
+    # With 'restore_state' connectors that are paused in snapshot are paused and connectors that are not are
+    # resumed, if their state differs from one in snapshot. Workers since 3.7 create connectors paused right away,
+    # older ones run them until they are paused, which is noted in report.
+    name_matcher = _name_matcher(name_pattern)
+    connectors = {connector_name: connector for connector_name, connector in snapshot['connectors'].items()
+                  if name_matcher.fullmatch(connector_name)}
+    current_states = _get_connector_states(transport, base_url) if restore_state else {}
+    initial_states = {}
+    if restore_state and _version_at_least(_get_worker_version(transport, base_url), (3, 7)):
+        initial_states = {connector_name: State.PAUSED for connector_name, connector in connectors.items()
+                          if connector.get('state') == State.PAUSED.name}
+    configurations = {connector_name: connector['config'] for connector_name, connector in connectors.items()}
+    reports = _apply_connectors(transport, base_url, configurations, False, dry_run, parallelism, initial_states)
+    if not restore_state:
+        return reports
+
+    def restore(report):
+        connector_name = report['connector']
+        report['state'] = None
+        if 'state' not in connectors[connector_name] or report['result'] == 'failed':
+            return report
+        desired = State.PAUSED if connectors[connector_name]['state'] == State.PAUSED.name else State.RUNNING
+        # State is not known if worker does not support expanded listing, then connector is paused or resumed anyway.
+        if report['action'] == 'create':
+            current = initial_states.get(connector_name, State.RUNNING)
+        else:
+            current = current_states.get(connector_name, State.RUNNING)
+        if desired == current or (desired == State.RUNNING and current not in (State.PAUSED, None)):
+            return report
+        report['state'] = {'current': current.name if current is not None else None, 'desired': desired.name}
+        if report['action'] == 'create':
+            report['state']['note'] = 'Created running, it ran until it was paused'
+        if dry_run:
+            return report
+        try:
+            if desired == State.PAUSED:
+                _pause_connector(transport, base_url, connector_name)
+            else:
+                _resume_connector(transport, base_url, connector_name)
+            report['result'] = 'ok'
+        except Exception as err:
+            report['result'] = 'failed'
+            report['error'] = str(err)
+        return report
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        return list(executor.map(restore, reports))
+
+
+def _validate_connectors(transport, base_url, configurations, parallelism):
+    # Validates configurations given as mapping of connector name to its configuration by plugins installed on
+    # workers, concurrently. Configuration of plugin that is not installed is rejected without asking worker.
+    # Returns result and errors of each configuration field for each connector.
+    plugins = _get_connector_plugins(transport, base_url)
+
+    def validate(connector_name):
+        configuration = _normalize_config(connector_name, configurations[connector_name])
+        connector_class = configuration.get('connector.class')
+        plugin_class = _find_plugin_class(plugins, connector_class)
+        if plugin_class is None:
+            errors = {'connector.class': [f'Connector plugin {connector_class} is not installed']}
+        else:
+            try:
+                errors = _validation_errors(_put_json(transport, base_url,
+                                                      f'/connector-plugins/{plugin_class}/config/validate',
+                                                      configuration))
+            except Exception as err:
+                return _validation_result(connector_name, 'failed', {}, str(err))
+        if errors:
+            return _validation_result(connector_name, 'failed', errors,
+                                      f'Configuration errors: {sum(map(len, errors.values()))}')
+        return _validation_result(connector_name, 'ok', errors)
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        return list(executor.map(validate, configurations))
 
-def delete_connector(base_url, connector_name, backoff_limit=1, delay=0):
-    _retry(lambda: _delete_connector(base_url, connector_name),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+def _validation_errors(validation):
+    return {config['value']['name']: config['value']['errors']
+            for config in validation['configs'] if config['value']['errors']}
 
-def pause_connector(base_url, connector_name, backoff_limit=1, delay=0):
-    _retry(lambda: _pause_connector(base_url, connector_name),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+def _validation_result(connector_name, result, errors, error=None):
+    return {**_bulk_result(connector_name, result, error), 'errors': errors}
 
-def resume_connector(base_url, connector_name, backoff_limit=1, delay=0):
-    _retry(lambda: _resume_connector(base_url, connector_name),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+def _find_plugin_class(plugins, connector_class):
+    # Kafka connect accepts either full name of class, its simple name or simple name without 'Connector' suffix.
+    if not connector_class:
+        return None
+    for plugin in plugins:
+        simple_name = plugin['class'].rsplit('.', 1)[-1]
+        if connector_class in (plugin['class'], simple_name, re.sub(r'Connector$', '', simple_name)):
+            return plugin['class']
+    return None
 
-def delete_all_connectors(base_url, connector_name_pattern, backoff_limit=1, delay=0, verbose=False):
-    _retry(lambda: _delete_all_connectors(base_url, connector_name_pattern, verbose),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+_plugins = {}
+_plugins_lock = threading.Lock()
 
-def pause_all_connectors(base_url, connector_name_pattern, backoff_limit=1, delay=0, verbose=False):
-    _retry(lambda: _pause_all_connectors(base_url, connector_name_pattern, verbose),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+def _get_connector_plugins(transport, base_url):
+    # Plugins change only when workers are redeployed, so they are read once per PLUGINS_TTL seconds for each
+    # Kafka connect cluster.
+    urls = split_urls(base_url)
+    with _plugins_lock:
+        expires_at, plugins = _plugins.get(urls, (0, None))
+    if expires_at > time.monotonic():
+        return plugins
+    plugins = _get_json(transport, base_url, '/connector-plugins')
+    with _plugins_lock:
+        _plugins[urls] = (time.monotonic() + PLUGINS_TTL, plugins)
+    return plugins
 
-def resume_all_connectors(base_url, connector_name_pattern, backoff_limit=1, delay=0, verbose=False):
-    _retry(lambda: _resume_all_connectors(base_url, connector_name_pattern, verbose),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+def _get_worker_version(transport, base_url):
+    return _get_json(transport, base_url, '/').get('version', '')
 
-def list_connector_tasks(base_url, connector_name):
-    return _list_connector_tasks(base_url, connector_name)
 
+def _version_at_least(version, minimum):
+    match = re.match(r'(\d+)\.(\d+)', version)
+    return match is not None and (int(match.group(1)), int(match.group(2))) >= minimum
 
-def restart_connector_task(base_url, connector_name, task_id, backoff_limit=1, delay=0):
-    _retry(lambda: _restart_connector_task(base_url, connector_name, task_id),
-           lambda err: isinstance(err, requests.ConnectionError),
-           backoff_limit,
-           delay)
 
+def _wait_for_connectors(transport, base_url, connector_names, name_pattern, target_state, timeout, parallelism):
+    # Polls connectors, given by names or by pattern matched against connectors existing when wait starts, until
+    # connector and all its tasks are in target state. Connector is read again only while it is pending, connector
+    # that is not found yet is pending too. Wait stops as soon as any connector fails.
+    deadline = time.monotonic() + timeout
+    if connector_names is None:
+        connector_names = [connector_name for connector_name in _get_connectors(transport, base_url)
+                           if _name_matcher(name_pattern).fullmatch(connector_name)]
+    last_states = {}
+    running_since = {}
 
-def _list_connectors(base_url):
-    connector_states = []
-    for connector_name in _get_connectors(base_url):
-        connector_status = _get_connector_status(base_url, connector_name)
-        connector_state = State[connector_status['connector']['state']]
-        failed_tasks = []
+    def poll(connector_name):
         try:
-            for task in _get_tasks(base_url, connector_name):
-                task_id = task['id']['task']
-                task = _get_task_status(base_url, connector_name, task_id)
-                task_state = State[task['state']]
-                if task_state == State.FAILED:
-                    failed_tasks.append(task_id)
-                if task_state > connector_state:
-                    connector_state = task_state
-        except Exception:
-            connector_state = State.FAILED
-        connector_states.append(
-            {'connector': connector_name, 'state': connector_state.name, 'failedTasks': failed_tasks})
-    return connector_states
-
-
-def _create_connector(base_url, name, configuration, if_not_exists):
-    try:
-        _get_connector(base_url, name)
-        if not if_not_exists:
-            raise RuntimeError(f'Connector {name} already exists')
-    except ApiError as e:
-        if e.status == 404:
-            return _post_json(f'{base_url}/connectors', {'name': name, 'config': configuration})
+            connector_status = _get_connector_status(transport, base_url, connector_name)
+            connector_info = _get_connector(transport, base_url, connector_name)
+            connector = _read_connector_status(connector_name, connector_status,
+                                               _lookup_task_states(connector_info, connector_status))
+            if connector.error is not None:
+                raise connector.error
+        except Exception as err:
+            last_states[connector_name] = f'could not be read: {err}'
+            return None
+        states = [connector.state] + [task.state for task in connector.tasks]
+        connector_state = connector.overall_state.name
+        last_states[connector_name] = f'in state {connector_state}'
+        # Connector that is just created is running before its tasks are started, so running connector without tasks
+        # is done only once it has had no tasks for a while.
+        if all(state == target_state for state in states):
+            if target_state != State.RUNNING or connector.tasks or \
+                    time.monotonic() - running_since.setdefault(connector_name, time.monotonic()) >= NO_TASKS_GRACE:
+                return _wait_result(connector_name, connector_state, 'ok')
         else:
-            raise e
+            running_since.pop(connector_name, None)
+        if State.FAILED in states:
+            return _wait_result(connector_name, connector_state, 'failed', f'Connector {connector_name} failed')
+        return None
+
+    results = _poll(connector_names, poll, deadline, parallelism, True)
+    failed = any(result['result'] == 'failed' for result in results.values())
+    return [results.get(connector_name) or
+            _wait_result(connector_name, None, 'pending' if failed else 'failed',
+                         None if failed else f'Timed out, connector {connector_name} {last_states.get(connector_name)}')
+            for connector_name in connector_names]
+
+
+def _poll(targets, poll, deadline, parallelism, stop_on_failure):
+    # Calls poll for each target that is not done yet, concurrently, until all of them are done or deadline comes.
+    # Interval between rounds starts short and doubles each round, so fast changes are caught early while long ones
+    # are not polled too often. Poll returns result once target is done, None otherwise. Returns results mapped by
+    # target, targets that are not done are missing.
+    results = {}
+    pending = list(targets)
+    interval = POLL_INTERVAL
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        while pending:
+            for target, result in zip(pending, executor.map(poll, pending)):
+                if result is not None:
+                    results[target] = result
+            pending = [target for target in pending if target not in results]
+            if stop_on_failure and any(result['result'] == 'failed' for result in results.values()):
+                break
+            if not pending or time.monotonic() + interval > deadline:
+                break
+            time.sleep(interval)
+            interval = min(MAX_POLL_INTERVAL, interval * 2)
+    return results
+
 
+def _wait_result(connector_name, connector_state, result, error=None):
+    return {**_bulk_result(connector_name, result, error), 'state': connector_state}
 
-def _update_connector(base_url, name, configuration):
-    return _put_json(f'{base_url}/connectors/{name}/config', configuration)
 
+def _restart_result(connector_name, task_ids, result, error=None):
+    return {**_bulk_result(connector_name, result, error), 'tasks': task_ids}
 
-def _restart_connector(base_url, name):
-    _post_json(f'{base_url}/connectors/{name}/restart', None)
 
+def _get_connector_configs(transport, base_url, configurations, parallelism):
+    # Returns current configuration of each existing connector mapped by name. Worker which does not support
+    # expanded listing returns only names, then configurations are read only for connectors that are going to be
+    # compared, others just need to be known for pruning.
+    connectors = _get_json(transport, base_url, '/connectors?expand=info')
+    if isinstance(connectors, dict):
+        return {connector_name: connector['info']['config'] for connector_name, connector in connectors.items()}
+    compared = [connector_name for connector_name in connectors if connector_name in configurations]
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        current_configurations = dict(zip(compared, executor.map(
+            lambda connector_name: _get_connector_config(transport, base_url, connector_name), compared)))
+    return {connector_name: current_configurations.get(connector_name, {}) for connector_name in connectors}
 
-def _delete_connector(base_url, name):
-    _delete(f'{base_url}/connectors/{name}')
 
+def _normalize_config(connector_name, configuration):
+    # Kafka connect keeps all values as strings and adds name of connector to its configuration.
+    def normalize(value):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, (int, float)):
+            return str(value)
+        return json.dumps(value)
 
-def _pause_connector(base_url, name):
-    _put_json(f'{base_url}/connectors/{name}/pause', None)
+    normalized = {key: normalize(value) for key, value in configuration.items()}
+    normalized['name'] = connector_name
+    return normalized
 
 
-def _resume_connector(base_url, name):
-    _put_json(f'{base_url}/connectors/{name}/resume', None)
+def _config_changes(current, desired):
+    return {key: {'current': current.get(key), 'desired': desired.get(key)}
+            for key in sorted(current.keys() | desired.keys()) if current.get(key) != desired.get(key)}
 
 
-def _delete_all_connectors(base_url, name_pattern, verbose):
-    name_matcher = re.compile(name_pattern if name_pattern is not None else '.*')
-    for connector_name in _get_connectors(base_url):
-        if name_matcher.fullmatch(connector_name):
-            _delete(f'{base_url}/connectors/{connector_name}')
-            if verbose:
-                print(f'Connector {connector_name} deleted')
+def _name_matcher(name_pattern):
+    return re.compile(name_pattern if name_pattern is not None else '.*')
 
 
-def _pause_all_connectors(base_url, name_pattern, verbose):
-    name_matcher = re.compile(name_pattern if name_pattern is not None else '.*')
-    for connector_name in _get_connectors(base_url):
-        if name_matcher.fullmatch(connector_name):
-            _put_json(f'{base_url}/connectors/{connector_name}/pause', None)
-            if verbose:
-                print(f'Connector {connector_name} paused')
+def _in_target_state(connector_states, connector_name, target_state):
+    return target_state is not None and connector_states.get(connector_name) == target_state
 
 
-def _resume_all_connectors(base_url, name_pattern, verbose):
-    name_matcher = re.compile(name_pattern if name_pattern is not None else '.*')
-    for connector_name in _get_connectors(base_url):
-        if name_matcher.fullmatch(connector_name):
-            _put_json(f'{base_url}/connectors/{connector_name}/resume', None)
-            if verbose:
-                print(f'Connector {connector_name} resumed')
+def _bulk_result(connector_name, result, error=None):
+    return {'connector': connector_name, 'result': result, 'error': error}
 
 
-def _list_connector_tasks(base_url, connector_name):
-    tasks_states = []
+def _bulk_error_result(connector_name, target_state, err):
+    # Connector is deleted concurrently, nothing to do with it anymore.
+    if isinstance(err, ApiError) and err.status == 404 and target_state is None:
+        return _bulk_result(connector_name, 'skipped')
+    return _bulk_result(connector_name, 'failed', str(err))
+
+
+def _iter_connector_tasks(transport, base_url, connector_name):
     # Check connector first, not status. For some reason API returns status as 'RUNNING' when Kafka is down.
-    _get_json(f'{base_url}/connectors/{connector_name}')
-    for task in _get_connector_status(base_url, connector_name)['tasks']:
-        tasks_states.append({'taskId': task['id'], 'state': task['state'], 'trace': task.get('trace', '')})
-    return tasks_states
+    _get_json(transport, base_url, f'/connectors/{connector_name}')
+    yield from _iter_task_statuses(_get_connector_status(transport, base_url, connector_name))
 
 
-def _restart_connector_task(base_url, connector_name, task_id):
-    _post_json(f'{base_url}/connectors/{connector_name}/tasks/{task_id}/restart', None)
+def _iter_task_statuses(connector_status):
+    # Tasks are removed from status as they are yielded, so traces are released once they are consumed.
+    tasks = connector_status['tasks']
+    tasks.reverse()
+    while tasks:
+        task = tasks.pop()
+        yield TaskStatus(task['id'], State[task['state']], task.get('worker_id'), task.get('trace', ''))
 
 
-def _retry(func, is_retryable, backoff_limit, delay):
-    err = None
-    count = 0
-    while count < backoff_limit:
-        try:
-            return func()
-        except Exception as e:
-            err = e
-            if not is_retryable(e):
-                break
-            else:
-                count += 1
-                time.sleep(delay)
-    raise err
+def _restart_connector_task(transport, base_url, connector_name, task_id):
+    _post_json(transport, base_url, f'/connectors/{connector_name}/tasks/{task_id}/restart', None)
 
 
-def _get_connectors(base_url):
-    return _get_json(f'{base_url}/connectors')
+def _get_connectors(transport, base_url):
+    return _get_json(transport, base_url, '/connectors')
 
 
-def _get_connector_status(base_url, connector_name):
-    return _get_json(f'{base_url}/connectors/{connector_name}/status')
+def _get_expanded_connectors(transport, base_url):
+    # Returns statuses and info of all connectors mapped by name. Workers older than 2.3 ignore 'expand' and return
+    # just list of names, callers need to fall back to reading each connector separately.
+    return _get_json(transport, base_url, '/connectors?expand=status&expand=info')
 
 
-def _get_connector(base_url, connector_name):
-    return _get_json(f'{base_url}/connectors/{connector_name}')
+def _get_connector_states(transport, base_url):
+    # Returns state of each connector mapped by name. State is None if worker does not support expanded listing.
+    return _connector_states(_get_json(transport, base_url, '/connectors?expand=status'))
 
 
-def _get_connector_config(base_url, connector_name):
-    return _get_json(f'{base_url}/connectors/{connector_name}/config')
+def _connector_states(connectors):
+    if isinstance(connectors, dict):
+        return {connector_name: State[connector['status']['connector']['state']]
+                for connector_name, connector in connectors.items()}
+    return dict.fromkeys(connectors)
 
 
-def _get_tasks(base_url, connector_name):
-    return _get_json(f'{base_url}/connectors/{connector_name}/tasks')
+def _get_connector_status(transport, base_url, connector_name):
+    return _get_json(transport, base_url, f'/connectors/{connector_name}/status')
 
 
-def _get_task_status(base_url, connector_name, task_id):
-    return _get_json(f'{base_url}/connectors/{connector_name}/tasks/{task_id}/status')
+def _get_connector(transport, base_url, connector_name):
+    return _get_json(transport, base_url, f'/connectors/{connector_name}')
 
 
-def _get_json(url):
-    response = requests.get(url, timeout=TIMEOUT)
-    if response.status_code == 200:
-        return response.json()
-    raise ApiError(response.status_code,
-                   f'GET {url}: response status: {response.status_code}, message: {response.text}')
+def _get_connector_config(transport, base_url, connector_name):
+    return _get_json(transport, base_url, f'/connectors/{connector_name}/config')
 
 
-def _post_json(url, data):
-    response = requests.post(url, timeout=TIMEOUT, json=data)
-    if _is_not_2xx(response.status_code):
-        raise ApiError(response.status_code,
-                       f'POST {url}: response status: {response.status_code}, message: {response.text}')
-    if _is_json_response(response):
-        return response.json()
-    else:
-        return None
+def _get_connector_offsets(transport, base_url, connector_name):
+    return _get_json(transport, base_url, f'/connectors/{connector_name}/offsets')
+
+
+def _get_tasks(transport, base_url, connector_name):
+    return _get_json(transport, base_url, f'/connectors/{connector_name}/tasks')
+
+
+def _get_task_status(transport, base_url, connector_name, task_id):
+    return _get_json(transport, base_url, f'/connectors/{connector_name}/tasks/{task_id}/status')
+
 
+def _get_json(transport, base_url, path):
+    return _read_response('GET', transport.request('GET', base_url, path))
 
-def _put_json(url, data):
-    response = requests.put(url, timeout=TIMEOUT, json=data)
-    if _is_not_2xx(response.status_code):
+
+def _post_json(transport, base_url, path, data):
+    return _read_response('POST', transport.request('POST', base_url, path, json=data))
+
+
+def _put_json(transport, base_url, path, data):
+    return _read_response('PUT', transport.request('PUT', base_url, path, json=data))
+
+
+def _delete(transport, base_url, path):
+    _read_response('DELETE', transport.request('DELETE', base_url, path))
+
+
+def _read_response(method, response):
+    # Reads are expected to return 200 with JSON, writes any 2xx with optional JSON. Shared with asyncio API.
+    failed = response.status_code != 200 if method == 'GET' else _is_not_2xx(response.status_code)
+    if failed:
         raise ApiError(response.status_code,
-                       f'PUT {url}: response status: {response.status_code}, message: {response.text}')
-    if _is_json_response(response):
+                       f'{method} {response.url}: response status: {response.status_code}, message: {response.text}')
+    if method == 'GET' or _is_json_response(response):
         return response.json()
     else:
         return None
 
 
-def _delete(url):
-    response = requests.delete(url, timeout=TIMEOUT)
-    if _is_not_2xx(response.status_code):
-        raise ApiError(response.status_code,
-                       f'DELETE {url}: response status: {response.status_code}, message: {response.text}')
-
-
 def _is_not_2xx(response_code):
     return int(response_code / 100) != 2
 
 
 def _is_json_response(response):
-    mimetype, options = cgi.parse_header(response.headers.get('Content-Type', ''))
-    return mimetype == 'application/json'
+    mimetype = response.headers.get('Content-Type', '').split(';', 1)[0]
+    return mimetype.strip().lower() == 'application/json'
@@ -0,0 +1,485 @@
+import copy
+import random
+import re
+import threading
+import time
+from collections import deque
+
+# requests is imported once transport is created, so commands that do not talk to Kafka connect start fast.
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 5
+POOL_SIZE = 10
+ROUND_ROBIN = 'round-robin'
+LEAST_LATENCY = 'least-latency'
+COOLDOWN = 30
+MAX_FAILURES = 3
+DELAY = 0.1
+MAX_DELAY = 10
+RETRY_BUDGET = 0.2
+RETRYABLE_STATUSES = frozenset((409, 502, 503, 504))
+MIN_RATE = 0.5
+LATENCY_FACTOR = 2
+
+
+class RetryPolicy:
+    # How failed requests are retried. Request is retried on connection error, timeout or one of 'retryable_statuses'
+    # until it is sent 'max_attempts' times. Delay between attempts grows exponentially from 'delay' up to
+    # 'max_delay' seconds, with random jitter of up to half of it. No retry is made if it would end after
+    # 'deadline' seconds since start of operation.
+    def __init__(self, max_attempts=1, delay=DELAY, max_delay=MAX_DELAY, deadline=None,
+                 retryable_statuses=RETRYABLE_STATUSES):
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retryable_statuses = frozenset(retryable_statuses)
+
+    def replace(self, **changes):
+        policy = copy.copy(self)
+        for name, value in changes.items():
+            setattr(policy, name, value)
+        return policy
+
+    def backoff(self, attempt):
+        backoff = min(self.max_delay, self.delay * 2 ** (attempt - 1))
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+class RetryBudget:
+    # Limits share of retries among all requests, so bulk operations do not multiply load on worker that is already
+    # struggling. Token bucket holds up to 'min_retries' retries, each request adds 'ratio' of retry to it, so burst
+    # of retries never exceeds 'min_retries' however many requests were made before.
+    def __init__(self, ratio=RETRY_BUDGET, min_retries=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.tokens = float(min_retries)
+        self._lock = threading.Lock()
+
+    def request(self):
+        with self._lock:
+            self.tokens = min(self.min_retries, self.tokens + self.ratio)
+
+    def try_retry(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Governor:
+    # Protects workers, and the leader that every write is forwarded to, from bulk operations. Writes are limited
+    # to 'rate' per second by token bucket holding up to 'burst' tokens, at most 'max_reads' reads and 'max_writes'
+    # writes are in flight. With 'adaptive' rate of writes is halved when worker answers 409 (rebalance is in
+    # progress) or latency of 3 writes in a row grows over LATENCY_FACTOR times average, at most once per second,
+    # and recovers by 5% with each successful write. If 'rate' is not set, rate observed in the last second is halved
+    # and limit is lifted once it recovers twice over it. Time spent waiting is counted as throttling.
+    def __init__(self, rate=None, max_reads=None, max_writes=None, adaptive=False, burst=1):
+        self.rate = rate
+        self.max_reads = max_reads
+        self.max_writes = max_writes
+        self.adaptive = adaptive
+        self.burst = burst
+        self.current_rate = rate
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self.slowdowns = 0
+        self._reads = threading.BoundedSemaphore(max_reads) if max_reads else None
+        self._writes = threading.BoundedSemaphore(max_writes) if max_writes else None
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._ceiling = None
+        self._slowed_at = 0
+        self._latency = None
+        self._latencies = 0
+        self._slow_writes = 0
+        self._recent_writes = deque()
+        self._lock = threading.Lock()
+
+    def copy(self):
+        # Returns governor with the same settings and its own limits, e.g. for another cluster.
+        return Governor(self.rate, self.max_reads, self.max_writes, self.adaptive, self.burst)
+
+    def call(self, write, send):
+        # Sends request once limits allow it and adapts rate to its result.
+        start = time.monotonic()
+        semaphore = self._writes if write else self._reads
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            if write:
+                wait = self._try_token()
+                while wait is not None:
+                    time.sleep(wait)
+                    wait = self._try_token()
+            self._count(time.monotonic() - start)
+            sent = time.monotonic()
+            response = send()
+            if write and self.adaptive:
+                self._adapt(response.status_code, time.monotonic() - sent)
+            return response
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def summary(self):
+        with self._lock:
+            return {'requests': self.requests, 'throttled': self.throttled, 'waited': self.waited,
+                    'slowdowns': self.slowdowns, 'rate': self.current_rate}
+
+    def format(self):
+        summary = self.summary()
+        rate = f'{summary["rate"]:.1f}/s' if summary['rate'] is not None else 'unlimited'
+        return f'Throttled {summary["throttled"]} of {summary["requests"]} requests, ' \
+               f'waited {summary["waited"]:.1f} s in total, slowed down {summary["slowdowns"]} times, write rate {rate}'
+
+    def _try_token(self):
+        # Returns None once token is taken, otherwise how long to wait before the next try.
+        with self._lock:
+            now = time.monotonic()
+            self._recent_writes.append(now)
+            while self._recent_writes[0] < now - 1:
+                self._recent_writes.popleft()
+            rate = self.current_rate
+            if rate is None:
+                return None
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            self._recent_writes.pop()
+            return (1 - self._tokens) / rate
+
+    def _count(self, waited):
+        with self._lock:
+            self.requests += 1
+            if waited > 0.001:
+                self.throttled += 1
+                self.waited += waited
+
+    def _adapt(self, status, latency):
+        with self._lock:
+            if self._latencies >= 5 and latency > LATENCY_FACTOR * self._latency:
+                self._slow_writes += 1
+            else:
+                self._slow_writes = 0
+            rising = self._slow_writes >= 3
+            self._latency = latency if self._latency is None else 0.9 * self._latency + 0.1 * latency
+            self._latencies += 1
+            now = time.monotonic()
+            if status == 409 or rising:
+                if now - self._slowed_at >= 1:
+                    current_rate = self.current_rate
+                    if current_rate is None:
+                        current_rate = self._ceiling = max(MIN_RATE, len(self._recent_writes))
+                    self.current_rate = max(MIN_RATE, current_rate / 2)
+                    self._slowed_at = now
+                    self.slowdowns += 1
+            elif self.current_rate is not None and self.current_rate != self.rate:
+                self.current_rate *= 1.05
+                if self.rate is not None:
+                    self.current_rate = min(self.rate, self.current_rate)
+                elif self.current_rate >= 2 * self._ceiling:
+                    self.current_rate = None
+
+
+class RequestEvent:
+    # Record of one request made by transport, passed to hooks once request is completed. 'template' is path of
+    # request with names of connectors and ids of tasks replaced by placeholders, so requests to the same endpoint
+    # can be grouped together. 'status' is None and 'error' is set if no response has been received. 'latency'
+    # includes all retries.
+    __slots__ = ('timestamp', 'method', 'url', 'template', 'status', 'latency', 'bytes', 'retries', 'error')
+
+    def __init__(self, timestamp, method, url, template, status, latency, bytes, retries, error):
+        self.timestamp = timestamp
+        self.method = method
+        self.url = url
+        self.template = template
+        self.status = status
+        self.latency = latency
+        self.bytes = bytes
+        self.retries = retries
+        self.error = error
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Endpoint:
+    __slots__ = ('url', 'latency', 'failures', 'ejected_until')
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.failures = 0
+        self.ejected_until = 0
+
+
+class EndpointPool:
+    # Workers of the same Kafka connect cluster. Reads are spread between workers, writes go to the first available
+    # worker in order they are configured (worker forwards write to the leader anyway). Worker that fails
+    # 'max_failures' times in a row is not used for 'cooldown' seconds, unless all workers are ejected.
+    def __init__(self, urls, strategy=ROUND_ROBIN, max_failures=MAX_FAILURES, cooldown=COOLDOWN):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def candidates(self, spread):
+        # Returns endpoints in order they should be tried.
+        now = time.monotonic()
+        with self._lock:
+            available = [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now]
+            ejected = sorted((endpoint for endpoint in self.endpoints if endpoint.ejected_until > now),
+                             key=lambda endpoint: endpoint.ejected_until)
+            if spread and len(available) > 1:
+                if self.strategy == LEAST_LATENCY:
+                    # Endpoints that are not measured yet go first.
+                    available.sort(key=lambda endpoint: endpoint.latency or 0)
+                else:
+                    start = self._next % len(available)
+                    self._next += 1
+                    available = available[start:] + available[:start]
+        return available + ejected
+
+    def succeeded(self, endpoint, latency):
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.ejected_until = 0
+            endpoint.latency = latency if endpoint.latency is None else 0.8 * endpoint.latency + 0.2 * latency
+
+    def failed(self, endpoint):
+        with self._lock:
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                endpoint.ejected_until = time.monotonic() + self.cooldown
+
+
+class Transport:
+    # Owns single session, so TCP (and TLS) connections are kept alive and reused between requests.
+    def __init__(self, pool_size=POOL_SIZE, keep_alive=True, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, verify=True, cert=None, auth=None, headers=None, strategy=ROUND_ROBIN,
+                 max_failures=MAX_FAILURES, cooldown=COOLDOWN, retry_policy=None, retry_budget=None, hooks=None,
+                 governor=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.governor = governor
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.deadline_at = None
+        self.hooks = list(hooks or [])
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.verify = verify
+        self.session.cert = cert
+        self.session.auth = auth
+        if headers:
+            self.session.headers.update(headers)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        self._endpoint_pools = {}
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return self.connect_timeout, self.read_timeout
+
+    def endpoints(self, base_url):
+        # Pool is kept for each set of URLs, so state of workers is shared between calls.
+        urls = split_urls(base_url)
+        with self._lock:
+            if urls not in self._endpoint_pools:
+                self._endpoint_pools[urls] = EndpointPool(urls, self.strategy, self.max_failures, self.cooldown)
+            return self._endpoint_pools[urls]
+
+    def add_hook(self, hook):
+        # Hook is called with RequestEvent after each request, in thread that made request.
+        self.hooks.append(hook)
+
+    def replace(self, **changes):
+        # Returns transport that shares connections, workers, retry budget and hooks with this transport, with some of
+        # its settings, e.g. retry policy or timeouts, changed.
+        transport = copy.copy(self)
+        for name, value in changes.items():
+            setattr(transport, name, value)
+        return transport
+
+    def for_call(self, backoff_limit=None, delay=None):
+        # Returns transport for one call of library function. It shares connections, workers and retry budget with
+        # this transport, may override number of attempts and delay of retry policy, and starts its deadline.
+        return for_call(self, backoff_limit, delay)
+
+    def request(self, method, base_url, path, **kwargs):
+        # Retry and failover decisions are shared with AsyncTransport, only waiting and sending differ.
+        import requests
+
+        kwargs.setdefault('timeout', self.timeout)
+        policy = self.retry_policy
+        deadline_at = request_deadline(policy, self.deadline_at)
+        self.retry_budget.request()
+        timestamp = time.time()
+        start = time.monotonic()
+        attempt = 1
+        response = None
+        error = None
+        try:
+            while True:
+                try:
+                    response = self._send(method, base_url, path, **kwargs)
+                    if not is_retryable(policy, method, path, response.status_code):
+                        return response
+                    err = None
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if not may_resend(method, _is_connect_error(e)):
+                        raise
+                    response = None
+                    err = e
+                backoff = retry_delay(policy, self.retry_budget, attempt, deadline_at)
+                if backoff is None:
+                    if err is not None:
+                        raise err
+                    return response
+                time.sleep(backoff)
+                attempt += 1
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            call_hooks(self.hooks, timestamp, method, base_url, path, response, start, attempt - 1, error)
+
+    def _send(self, method, base_url, path, **kwargs):
+        if self.governor is not None:
+            return self.governor.call(method != 'GET',
+                                      lambda: self._send_to_endpoints(method, base_url, path, **kwargs))
+        return self._send_to_endpoints(method, base_url, path, **kwargs)
+
+    def _send_to_endpoints(self, method, base_url, path, **kwargs):
+        import requests
+
+        endpoints = self.endpoints(base_url)
+        read = method == 'GET'
+        err = None
+        for endpoint in endpoints.candidates(read):
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, endpoint.url + path, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                endpoints.failed(endpoint)
+                if not may_resend(method, _is_connect_error(e)):
+                    raise
+                err = e
+                continue
+            endpoints.succeeded(endpoint, time.monotonic() - start)
+            return response
+        raise err
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_default_transport = None
+
+
+def default_transport():
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = Transport()
+    return _default_transport
+
+
+def split_urls(base_url):
+    # URL of Kafka connect cluster is either URL of one worker, comma separated URLs of workers or list of them.
+    if isinstance(base_url, str):
+        base_url = base_url.split(',')
+    return tuple(url.strip().rstrip('/') for url in base_url if url.strip())
+
+
+def for_call(transport, backoff_limit, delay):
+    transport = copy.copy(transport)
+    if backoff_limit is not None:
+        transport.retry_policy = transport.retry_policy.replace(max_attempts=backoff_limit)
+    if delay is not None:
+        transport.retry_policy = transport.retry_policy.replace(delay=delay)
+    if transport.retry_policy.deadline is not None:
+        transport.deadline_at = time.monotonic() + transport.retry_policy.deadline
+    return transport
+
+
+def request_deadline(policy, deadline_at):
+    # Request made within call of library function ends by deadline of the call, otherwise it has its own deadline.
+    if deadline_at is None and policy.deadline is not None:
+        return time.monotonic() + policy.deadline
+    return deadline_at
+
+
+def is_retryable(policy, method, path, status):
+    # Conflict on creation of connector means it already exists, retry would fail the same way.
+    return status in policy.retryable_statuses and not (status == 409 and method == 'POST' and path == '/connectors')
+
+
+def may_resend(method, connect_error):
+    # Write that timed out or lost connection may have been applied, it is sent again, to the same or the next worker,
+    # only if connection to worker has not been established.
+    return method == 'GET' or connect_error
+
+
+def retry_delay(policy, retry_budget, attempt, deadline_at):
+    # Returns how long to wait before the next attempt, or None if request is not retried any more.
+    backoff = policy.backoff(attempt)
+    if attempt >= policy.max_attempts or (deadline_at is not None and time.monotonic() + backoff > deadline_at) or \
+            not retry_budget.try_retry():
+        return None
+    return backoff
+
+
+def call_hooks(hooks, timestamp, method, base_url, path, response, start, retries, error):
+    if hooks:
+        event = request_event(timestamp, method, base_url, path, response, time.monotonic() - start, retries, error)
+        for hook in hooks:
+            hook(event)
+
+
+def request_event(timestamp, method, base_url, path, response, latency, retries, error):
+    url = response.url if response is not None else split_urls(base_url)[0] + path
+    return RequestEvent(timestamp, method, str(url), url_template(path),
+                        response.status_code if response is not None else None, latency,
+                        len(response.content) if response is not None else 0, retries,
+                        str(error) if error is not None else None)
+
+
+_URL_TEMPLATES = ((re.compile(r'^/connectors/[^/?]+'), '/connectors/{connector}'),
+                  (re.compile(r'/tasks/\d+'), '/tasks/{task}'),
+                  (re.compile(r'^/connector-plugins/[^/?]+/'), '/connector-plugins/{plugin}/'))
+
+
+def url_template(path):
+    for pattern, replacement in _URL_TEMPLATES:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+def _is_connect_error(err):
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    return isinstance(err, requests.ConnectTimeout) or \
+        isinstance(getattr(err.args[0] if err.args else None, 'reason', None), NewConnectionError)
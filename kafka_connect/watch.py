@@ -0,0 +1,166 @@
+import json
+import random
+import threading
+import time
+
+from kafka_connect.kafka_connect import State, PARALLELISM, _check_health
+from kafka_connect.transport import default_transport
+
+INTERVAL = 10
+JITTER = 0.1
+
+
+class HealthSnapshot:
+    __slots__ = ('exit_code', 'connectors', 'timestamp', 'duration')
+
+    def __init__(self, exit_code, connectors, timestamp, duration):
+        self.exit_code = exit_code
+        self.connectors = connectors
+        self.timestamp = timestamp
+        self.duration = duration
+
+
+class HealthWatcher:
+    # Polls health of all connectors in background and keeps result of the last check in memory. Connector and task
+    # states of the last successful check are kept when check fails, so metrics do not disappear while
+    # Kafka connect server is not reachable.
+    def __init__(self, base_url, interval=INTERVAL, jitter=JITTER, transport=None, parallelism=PARALLELISM,
+                 verbose=False, connector_filter=None):
+        self.base_url = base_url
+        self.connector_filter = connector_filter
+        self.interval = interval
+        self.jitter = jitter
+        self.transport = transport or default_transport()
+        self.parallelism = parallelism
+        self.verbose = verbose
+        self.snapshot = None
+        self.connectors = []
+        self.checks = 0
+        self.failed_checks = 0
+        self._stopped = threading.Event()
+
+    def check(self):
+        start = time.monotonic()
+        exit_code, connectors = _check_health(self.transport.for_call(), self.base_url, self.parallelism,
+                                              print if self.verbose else None, self.connector_filter)
+        if exit_code < 2:
+            self.connectors = connectors
+        else:
+            self.failed_checks += 1
+        self.checks += 1
+        self.snapshot = HealthSnapshot(exit_code, self.connectors, time.time(), time.monotonic() - start)
+        return self.snapshot
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.check()
+            self._stopped.wait(self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def start(self):
+        threading.Thread(target=self.run, name='health-watcher', daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def is_healthy(self):
+        # Result is considered outdated if watcher missed few checks in a row, e.g. check hangs.
+        snapshot = self.snapshot
+        return snapshot is not None and snapshot.exit_code == 0 and \
+            time.time() - snapshot.timestamp < 3 * self.interval * (1 + self.jitter) + snapshot.duration
+
+    def metrics(self):
+        snapshot = self.snapshot
+        lines = []
+        if snapshot is not None:
+            lines += ['# HELP kafka_connect_connector_state Connector state, 1 for the current state of connector.',
+                      '# TYPE kafka_connect_connector_state gauge']
+            for connector in snapshot.connectors:
+                for state in State:
+                    lines.append(f'kafka_connect_connector_state{{connector="{_escape(connector.name)}",'
+                                 f'state="{state.name}"}} {int(state == connector.state)}')
+            lines += ['# HELP kafka_connect_task_state Task state, 1 for the current state of task.',
+                      '# TYPE kafka_connect_task_state gauge']
+            for connector in snapshot.connectors:
+                for task in connector.tasks:
+                    for state in State:
+                        lines.append(f'kafka_connect_task_state{{connector="{_escape(connector.name)}",'
+                                     f'task="{task.id}",state="{state.name}"}} {int(state == task.state)}')
+            lines += ['# HELP kafka_connect_health_check_status Exit code of the last health check.',
+                      '# TYPE kafka_connect_health_check_status gauge',
+                      f'kafka_connect_health_check_status {snapshot.exit_code}',
+                      '# HELP kafka_connect_scrape_duration_seconds Duration of the last health check.',
+                      '# TYPE kafka_connect_scrape_duration_seconds gauge',
+                      f'kafka_connect_scrape_duration_seconds {snapshot.duration:.6f}',
+                      '# HELP kafka_connect_scrape_timestamp_seconds Time of the last health check.',
+                      '# TYPE kafka_connect_scrape_timestamp_seconds gauge',
+                      f'kafka_connect_scrape_timestamp_seconds {snapshot.timestamp:.3f}',
+                      '# HELP kafka_connect_scrape_success Whether Kafka connect server was read successfully.',
+                      '# TYPE kafka_connect_scrape_success gauge',
+                      f'kafka_connect_scrape_success {int(snapshot.exit_code < 2)}']
+        lines += ['# HELP kafka_connect_scrapes_total Number of health checks.',
+                  '# TYPE kafka_connect_scrapes_total counter',
+                  f'kafka_connect_scrapes_total {self.checks}',
+                  '# HELP kafka_connect_scrape_errors_total Number of health checks that failed to read Kafka connect.',
+                  '# TYPE kafka_connect_scrape_errors_total counter',
+                  f'kafka_connect_scrape_errors_total {self.failed_checks}']
+        return '\n'.join(lines) + '\n'
+
+    def status(self):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {'healthy': False, 'exitCode': None, 'timestamp': None}
+        return {'healthy': self.is_healthy(), 'exitCode': snapshot.exit_code, 'timestamp': snapshot.timestamp}
+
+
+def watch_health(base_url, host='', port=9400, interval=INTERVAL, jitter=JITTER, transport=None,
+                 parallelism=PARALLELISM, verbose=False, connector_filter=None):
+    # Checks health periodically and serves result over HTTP until interrupted:
+    #   /metrics - connector and task states in Prometheus text format
+    #   /health - cached result of the last check, 200 if healthy, 503 otherwise
+    from http.server import HTTPServer
+    from socketserver import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    watcher = HealthWatcher(base_url, interval, jitter, transport, parallelism, verbose, connector_filter)
+    server = ThreadingHTTPServer((host, port), _handler(watcher))
+    watcher.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        server.server_close()
+
+
+def _handler(watcher):
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/metrics':
+                self._send(200, 'text/plain; version=0.0.4; charset=utf-8', watcher.metrics())
+            elif path in ('/', '/health'):
+                self._send(200 if watcher.is_healthy() else 503, 'application/json', json.dumps(watcher.status()))
+            else:
+                self._send(404, 'text/plain; charset=utf-8', 'Not found\n')
+
+        def _send(self, status, content_type, body):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
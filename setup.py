@@ -23,6 +23,7 @@ setup(
     version=VERSION,
     packages=find_packages(),
     install_requires=install_requires,
+    extras_require={'async': ['aiohttp>=3.7']},
     python_requires='>=3.6',
     entry_points='''
             [console_scripts]
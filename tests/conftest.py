@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fake_connect import FakeConnectCluster, serve  # noqa: E402
+
+
+@pytest.fixture
+def connect():
+    # Starts fake Kafka connect cluster with given settings, returns cluster and its URL. Servers are stopped once
+    # test is done.
+    servers = []
+
+    def start(**settings):
+        cluster = FakeConnectCluster(**settings)
+        server, url = serve(cluster)
+        servers.append(server)
+        return cluster, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
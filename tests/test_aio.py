@@ -0,0 +1,97 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from kafka_connect import aio
+from kafka_connect.transport import RetryPolicy
+
+CONNECTOR = {'name': 'new', 'config': {'connector.class': 'Fake'}}
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_health_check_when_kafka_is_down(connect, expand):
+    _, url = connect(connectors=2, expand=expand, kafka_down=True)
+    assert asyncio.run(aio.health_check(url)) == 3
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_list_connectors(connect, expand):
+    _, url = connect(connectors=2, failed_tasks=1, expand=expand)
+    assert asyncio.run(aio.list_connectors(url)) == [
+        {'connector': 'connector-00000', 'state': 'FAILED', 'failedTasks': [0]},
+        {'connector': 'connector-00001', 'state': 'RUNNING', 'failedTasks': []}]
+
+
+def test_pause_all_connectors(connect):
+    cluster, url = connect(connectors=2)
+    cluster.connectors['connector-00001']['state'] = 'PAUSED'
+    assert asyncio.run(aio.pause_all_connectors(url, 'connector-.*')) == [
+        {'connector': 'connector-00000', 'result': 'ok', 'error': None},
+        {'connector': 'connector-00001', 'result': 'skipped', 'error': None}]
+    assert {connector['state'] for connector in cluster.connectors.values()} == {'PAUSED'}
+
+
+def test_create_connector_if_not_exists(connect):
+    cluster, url = connect(connectors=0)
+
+    async def create_twice():
+        async with aio.AsyncTransport() as transport:
+            await aio.create_connector(url, 'new', CONNECTOR['config'], transport=transport)
+            await aio.create_connector(url, 'new', CONNECTOR['config'], if_not_exists=True, transport=transport)
+            with pytest.raises(RuntimeError, match='Connector new already exists'):
+                await aio.create_connector(url, 'new', CONNECTOR['config'], transport=transport)
+
+    asyncio.run(create_twice())
+    assert list(cluster.connectors) == ['new']
+
+
+def request(transport, method, base_url, path, **kwargs):
+    async def send():
+        async with transport:
+            return await transport.request(method, base_url, path, **kwargs)
+
+    return asyncio.run(send())
+
+
+def test_write_is_not_retried_after_read_timeout(connect):
+    cluster, url = connect(connectors=0, latency=0.6)
+    transport = aio.AsyncTransport(read_timeout=0.3, retry_policy=RetryPolicy(max_attempts=3, delay=0))
+    with pytest.raises(asyncio.TimeoutError):
+        request(transport, 'POST', url, '/connectors', json=CONNECTOR)
+    assert cluster.requests == 1
+
+
+def test_read_is_retried_after_read_timeout(connect):
+    cluster, url = connect(connectors=0, latency=0.6)
+    transport = aio.AsyncTransport(read_timeout=0.3, retry_policy=RetryPolicy(max_attempts=3, delay=0))
+    with pytest.raises(asyncio.TimeoutError):
+        request(transport, 'GET', url, '/connectors')
+    assert cluster.requests == 3
+
+
+def test_write_is_sent_to_next_worker_after_connect_error(connect):
+    cluster, url = connect(connectors=0)
+    transport = aio.AsyncTransport(retry_policy=RetryPolicy(max_attempts=1))
+    assert request(transport, 'POST', f'http://127.0.0.1:1,{url}', '/connectors', json=CONNECTOR).status_code == 201
+    assert list(cluster.connectors) == ['new']
+
+
+def test_write_fails_if_no_worker_is_reachable():
+    transport = aio.AsyncTransport(retry_policy=RetryPolicy(max_attempts=2, delay=0))
+    with pytest.raises(aiohttp.ClientConnectorError):
+        request(transport, 'POST', 'http://127.0.0.1:1', '/connectors', json=CONNECTOR)
+
+
+def test_governor_limits_rate_of_writes(connect):
+    cluster, url = connect(connectors=4)
+    governor = aio.AsyncGovernor(rate=10)
+
+    async def pause_all():
+        async with aio.AsyncTransport(governor=governor) as transport:
+            return await aio.pause_all_connectors(url, 'connector-.*', transport=transport)
+
+    assert [record['result'] for record in asyncio.run(pause_all())] == ['ok'] * 4
+    summary = governor.summary()
+    assert (summary['requests'], summary['throttled']) == (5, 3)
+    assert summary['waited'] >= 0.2
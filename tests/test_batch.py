@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from kafka_connect.__main__ import build_parser, run
+from kafka_connect.batch import read_stages, run_batch
+
+
+def run_batch_file(tmp_path, url, text, *argv):
+    batch = tmp_path / 'batch.txt'
+    batch.write_text(text)
+    parser = build_parser()
+    with pytest.raises(SystemExit) as e:
+        run(parser, parser.parse_args(['batch', '--url', url, '--file', str(batch)] + list(argv)))
+    return e.value.code
+
+
+def test_read_stages():
+    assert read_stages(['connector pause --name a  # comment', "connector pause --name 'b c'", '', '', '# comment',
+                        'connector list']) == [[(1, ['connector', 'pause', '--name', 'a']),
+                                                (2, ['connector', 'pause', '--name', 'b c'])],
+                                               [(6, ['connector', 'list'])]]
+
+
+def test_output_is_printed_in_order_of_commands(connect, capsys, tmp_path):
+    cluster, url = connect(connectors=2, latency=0.05)
+    assert run_batch_file(tmp_path, url, 'connector pause --name connector-00000\n'
+                                         'connector pause --name connector-00001\n'
+                                         '\n'
+                                         'connector get --name connector-00001\n'
+                                         'connector get --name connector-00000\n', '--parallelism', '2') == 0
+    assert {connector['state'] for connector in cluster.connectors.values()} == {'PAUSED'}
+    out = capsys.readouterr().out
+    decoder = json.JSONDecoder()
+    first, end = decoder.raw_decode(out)
+    second, _ = decoder.raw_decode(out[end:].lstrip())
+    assert (first['connector'], second['connector']) == ('connector-00001', 'connector-00000')
+
+
+def test_next_stages_are_skipped_after_failure(connect, capsys, tmp_path):
+    cluster, url = connect(connectors=1)
+    text = 'connector get --name missing\n' \
+           'connector pause --name connector-00000\n' \
+           '\n' \
+           'connector delete --name connector-00000\n'
+    assert run_batch_file(tmp_path, url, text) == 1
+    assert list(cluster.connectors) == ['connector-00000']
+    assert cluster.connectors['connector-00000']['state'] == 'PAUSED'
+    err = capsys.readouterr().err
+    assert 'Line 1: connector get --name missing: exit code 1' in err
+    assert 'Skipped 1 commands of next stages' in err
+
+    assert run_batch_file(tmp_path, url, text, '--keep-going') == 1
+    assert list(cluster.connectors) == []
+
+
+def test_run_batch_returns_highest_exit_code(capsys):
+    def execute(tokens):
+        if tokens[0] == 'exit':
+            raise SystemExit(int(tokens[1]))
+        print(' '.join(tokens))
+
+    assert run_batch([[(1, ['echo', 'a']), (2, ['exit', '3'])], [(4, ['echo', 'b'])]], execute, parallelism=2,
+                     keep_going=True) == 3
+    assert capsys.readouterr().out == 'echo a\necho b\n'
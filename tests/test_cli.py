@@ -0,0 +1,101 @@
+import io
+import json
+
+import pytest
+
+from kafka_connect.__main__ import build_parser, run, read_configurations
+
+
+def run_command(*argv):
+    parser = build_parser()
+    run(parser, parser.parse_args(argv))
+
+
+def test_bulk_command_accepts_deprecated_verbose(connect, capsys):
+    cluster, url = connect(connectors=1)
+    run_command('connector', 'pause-all', '--url', url, '--verbose')
+    assert json.loads(capsys.readouterr().out) == [{'connector': 'connector-00000', 'result': 'ok', 'error': None}]
+    assert cluster.connectors['connector-00000']['state'] == 'PAUSED'
+
+
+def test_bulk_command_exits_with_1_if_any_connector_failed(connect, capsys, monkeypatch):
+    cluster, url = connect(connectors=2)
+    handle = cluster.handle
+
+    def fail_delete(method, path, query, body):
+        if method == 'DELETE' and path.endswith('-00001'):
+            return 500, {'error_code': 500, 'message': 'Injected error'}
+        return handle(method, path, query, body)
+
+    monkeypatch.setattr(cluster, 'handle', fail_delete)
+    with pytest.raises(SystemExit) as e:
+        run_command('connector', 'delete-all', '--url', url)
+    assert e.value.code == 1
+    report = json.loads(capsys.readouterr().out)
+    assert [(record['connector'], record['result']) for record in report] == [('connector-00000', 'ok'),
+                                                                              ('connector-00001', 'failed')]
+
+
+def test_read_configurations_from_stdin_requires_name(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO('{"connector.class": "Fake"}'))
+    with pytest.raises(ValueError, match='Name of connector is not specified'):
+        read_configurations('-')
+
+
+def test_read_configurations_from_stdin(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO('{"name": "a", "connector.class": "Fake"}'))
+    assert read_configurations('-') == {'a': {'name': 'a', 'connector.class': 'Fake'}}
+
+
+def test_read_configurations_from_directory(tmp_path):
+    (tmp_path / 'a.json').write_text('{"connector.class": "Fake"}')
+    (tmp_path / 'more.json').write_text('[{"name": "b", "config": {"connector.class": "Fake"}}, '
+                                        '{"name": "c", "connector.class": "Fake"}]')
+    assert read_configurations(str(tmp_path)) == {'a': {'connector.class': 'Fake'},
+                                                  'b': {'connector.class': 'Fake'},
+                                                  'c': {'name': 'c', 'connector.class': 'Fake'}}
+
+
+@pytest.mark.parametrize('output', ['json', 'ndjson'])
+def test_list_without_connectors(connect, capsys, output):
+    _, url = connect(connectors=0)
+    run_command('connector', 'list', '--url', url, '--output', output)
+    assert capsys.readouterr().out == ('[]\n' if output == 'json' else '')
+
+
+def test_list_connectors(connect, capsys):
+    _, url = connect(connectors=2)
+    run_command('connector', 'list', '--url', url)
+    assert json.loads(capsys.readouterr().out) == [
+        {'connector': 'connector-00000', 'state': 'RUNNING', 'failedTasks': []},
+        {'connector': 'connector-00001', 'state': 'RUNNING', 'failedTasks': []}]
+
+
+def test_list_connectors_as_ndjson(connect, capsys):
+    _, url = connect(connectors=2, failed_tasks=1)
+    run_command('connector', 'list', '--url', url, '--output', 'ndjson')
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == [
+        {'connector': 'connector-00000', 'state': 'FAILED', 'failedTasks': [0]},
+        {'connector': 'connector-00001', 'state': 'RUNNING', 'failedTasks': []}]
+
+
+def test_list_connectors_as_table(connect, capsys):
+    _, url = connect(connectors=2, failed_tasks=1)
+    run_command('connector', 'list', '--url', url, '--output', 'table')
+    assert capsys.readouterr().out.splitlines() == ['CONNECTOR        STATE    FAILEDTASKS',
+                                                    'connector-00000  FAILED   0',
+                                                    'connector-00001  RUNNING']
+
+
+def test_list_tasks_of_connector_without_tasks(connect, capsys):
+    _, url = connect(connectors=1, tasks=0)
+    run_command('task', 'list', '--url', url, '--connector', 'connector-00000')
+    assert capsys.readouterr().out == '[]\n'
+
+
+def test_list_in_clusters_without_connectors(connect, capsys, tmp_path):
+    _, url = connect(connectors=0)
+    inventory = tmp_path / 'inventory.json'
+    inventory.write_text(json.dumps({'dev': {'url': url}, 'test': {'url': [url]}}))
+    run_command('connector', 'list', '--inventory', str(inventory), '--clusters', 'all')
+    assert capsys.readouterr().out == '[]\n'
@@ -0,0 +1,62 @@
+import pytest
+
+from kafka_connect.filters import parse_where
+from kafka_connect.kafka_connect import list_connectors, health_check, pause_all_connectors
+
+
+def names(records):
+    return [record['connector'] for record in records]
+
+
+@pytest.mark.parametrize('expression', ['state', 'color=red', 'failed-tasks~1', 'class>a'])
+def test_invalid_condition(expression):
+    with pytest.raises(ValueError):
+        parse_where([expression])
+
+
+def test_no_conditions():
+    assert parse_where([]) is None
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_state_is_state_connector_is_listed_with(connect, expand):
+    # The first connector is paused and its task has failed, it is listed as FAILED.
+    _, url = connect(connectors=3, paused=2, failed_tasks=1, expand=expand)
+    assert list_connectors(url, connector_filter=parse_where(['state=PAUSED'])) == [
+        {'connector': 'connector-00001', 'state': 'PAUSED', 'failedTasks': []}]
+    assert names(list_connectors(url, connector_filter=parse_where(['state=failed']))) == ['connector-00000']
+    assert names(list_connectors(url, connector_filter=parse_where(['connector-state=PAUSED']))) == [
+        'connector-00000', 'connector-00001']
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_conditions_are_combined(connect, expand):
+    _, url = connect(connectors=12, failed_tasks=3, expand=expand)
+    connector_filter = parse_where(['failed-tasks>0', r'topic~topic-\d', 'class!~.*Sink.*', 'worker=worker-1:8083'])
+    assert names(list_connectors(url, connector_filter=connector_filter)) == [
+        'connector-00000', 'connector-00001', 'connector-00002']
+    assert names(list_connectors(url, connector_filter=parse_where(['topic!=topic-1', 'name~connector-0000[0-2]']))) \
+        == ['connector-00000', 'connector-00002']
+
+
+def test_connector_is_read_only_as_far_as_conditions_need(connect):
+    # Worker older than 2.3 lists names only, configuration is read to check class, nothing else is read for
+    # connectors that do not match name.
+    cluster, url = connect(connectors=10, expand=False)
+    assert names(list_connectors(url, connector_filter=parse_where(['name=connector-00003', 'class~.*Fake.*']))) \
+        == ['connector-00003']
+    # Listing, configuration, status, list of tasks and status of each of 2 tasks.
+    assert cluster.requests == 6
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_connectors_are_not_filtered_by_tasks_that_can_not_be_read(connect, expand):
+    _, url = connect(connectors=2, expand=expand, kafka_down=True)
+    assert health_check(url, connector_filter=parse_where(['state=RUNNING'])) == 3
+
+
+def test_bulk_command_changes_matching_connectors_only(connect):
+    cluster, url = connect(connectors=3)
+    assert names(pause_all_connectors(url, None, connector_filter=parse_where(['topic=topic-1']))) == [
+        'connector-00001']
+    assert [connector['state'] for connector in cluster.connectors.values()] == ['RUNNING', 'PAUSED', 'RUNNING']
@@ -0,0 +1,52 @@
+import io
+import json
+
+import pytest
+import requests
+
+from kafka_connect.instrumentation import RequestStats, TraceWriter
+from kafka_connect.kafka_connect import list_connectors
+from kafka_connect.transport import Transport, RetryPolicy
+
+
+def test_requests_are_aggregated_by_url_template(connect, monkeypatch):
+    cluster, url = connect(connectors=2, tasks=1, expand=False)
+    handle = cluster.handle
+    failures = ['/connectors']
+
+    def fail_once(method, path, query, body):
+        if path in failures:
+            failures.remove(path)
+            return 503, {'error_code': 503, 'message': 'Injected error'}
+        return handle(method, path, query, body)
+
+    monkeypatch.setattr(cluster, 'handle', fail_once)
+    stats = RequestStats()
+    trace = io.StringIO()
+    transport = Transport(retry_policy=RetryPolicy(max_attempts=2, delay=0), hooks=[stats, TraceWriter(trace)])
+    list_connectors(url, transport=transport, backoff_limit=2, delay=0)
+    records = {(record['method'], record['template']): record for record in stats.summary()}
+    assert {key: (record['count'], record['errors'], record['retries']) for key, record in records.items()} == {
+        ('GET', '/connectors?expand=status&expand=info'): (1, 0, 1),
+        ('GET', '/connectors/{connector}/status'): (2, 0, 0),
+        ('GET', '/connectors/{connector}/tasks'): (2, 0, 0),
+        ('GET', '/connectors/{connector}/tasks/{task}/status'): (2, 0, 0)}
+    assert all(record['p50'] <= record['p99'] <= record['max'] for record in records.values())
+    assert stats.format().splitlines()[0].split()[:3] == ['METHOD', 'ENDPOINT', 'COUNT']
+
+    events = [json.loads(line) for line in trace.getvalue().splitlines()]
+    assert len(events) == 7
+    assert events[0]['url'] == url + '/connectors?expand=status&expand=info'
+    assert (events[0]['status'], events[0]['retries'], events[0]['error']) == (200, 1, None)
+    assert {event['template'] for event in events[1:]} == {'/connectors/{connector}/status',
+                                                           '/connectors/{connector}/tasks',
+                                                           '/connectors/{connector}/tasks/{task}/status'}
+
+
+def test_request_without_response_is_counted_as_error():
+    stats = RequestStats()
+    transport = Transport(retry_policy=RetryPolicy(max_attempts=1), hooks=[stats])
+    with pytest.raises(requests.ConnectionError):
+        transport.request('GET', 'http://127.0.0.1:1', '/connectors')
+    [record] = stats.summary()
+    assert (record['count'], record['errors'], record['bytes']) == (1, 1, 0)
@@ -0,0 +1,257 @@
+import pytest
+
+from fake_connect import CONNECTOR_CLASS
+
+from kafka_connect.kafka_connect import pause_all_connectors, resume_all_connectors, delete_all_connectors, \
+    apply_connectors, create_connector, wait_for_connectors, State, list_connectors, health_check, \
+    restart_failed_tasks, ConnectorStatus, TaskStatus, snapshot_connectors, restore_connectors, write_snapshot, \
+    read_snapshot, validate_connectors
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_list_connectors(connect, expand):
+    _, url = connect(connectors=3, failed_tasks=1, paused=1, expand=expand)
+    assert list_connectors(url) == [{'connector': 'connector-00000', 'state': 'FAILED', 'failedTasks': [0]},
+                                    {'connector': 'connector-00001', 'state': 'RUNNING', 'failedTasks': []},
+                                    {'connector': 'connector-00002', 'state': 'RUNNING', 'failedTasks': []}]
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_list_connectors_without_connectors(connect, expand):
+    _, url = connect(connectors=0, expand=expand)
+    assert list_connectors(url) == []
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_list_connectors_when_kafka_is_down(connect, expand):
+    # Statuses say RUNNING, but tasks can not be read.
+    _, url = connect(connectors=2, expand=expand, kafka_down=True)
+    assert list_connectors(url) == [{'connector': 'connector-00000', 'state': 'FAILED', 'failedTasks': []},
+                                    {'connector': 'connector-00001', 'state': 'FAILED', 'failedTasks': []}]
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_health_check(connect, expand):
+    _, healthy_url = connect(connectors=3, paused=1, expand=expand)
+    _, failed_url = connect(connectors=3, failed_tasks=1, expand=expand)
+    assert health_check(healthy_url) == 0
+    assert health_check(failed_url) == 1
+
+
+@pytest.mark.parametrize('expand', [True, False])
+def test_health_check_when_kafka_is_down(connect, expand):
+    _, url = connect(connectors=2, expand=expand, kafka_down=True)
+    assert health_check(url) == 3
+
+
+def test_health_check_refused_connection():
+    assert health_check('http://127.0.0.1:1') == 2
+
+
+def test_pause_all_connectors_skips_paused(connect):
+    cluster, url = connect(connectors=3, paused=1)
+    assert pause_all_connectors(url, None) == [
+        {'connector': 'connector-00000', 'result': 'skipped', 'error': None},
+        {'connector': 'connector-00001', 'result': 'ok', 'error': None},
+        {'connector': 'connector-00002', 'result': 'ok', 'error': None}]
+    assert all(connector['state'] == 'PAUSED' for connector in cluster.connectors.values())
+
+
+def test_resume_all_connectors_by_pattern(connect):
+    cluster, url = connect(connectors=3, paused=3)
+    assert resume_all_connectors(url, 'connector-0000[01]') == [
+        {'connector': 'connector-00000', 'result': 'ok', 'error': None},
+        {'connector': 'connector-00001', 'result': 'ok', 'error': None}]
+    assert cluster.connectors['connector-00002']['state'] == 'PAUSED'
+
+
+def test_delete_all_connectors(connect):
+    cluster, url = connect(connectors=2)
+    assert delete_all_connectors(url, None) == [{'connector': 'connector-00000', 'result': 'ok', 'error': None},
+                                                {'connector': 'connector-00001', 'result': 'ok', 'error': None}]
+    assert cluster.connectors == {}
+
+
+def test_bulk_functions_accept_verbose_positionally(connect):
+    _, url = connect(connectors=1)
+    assert pause_all_connectors(url, None, 1, 0, True) == [
+        {'connector': 'connector-00000', 'result': 'ok', 'error': None}]
+
+
+def test_apply_connectors_changes_only_connectors_that_differ(connect):
+    cluster, url = connect(connectors=3, tasks=1)
+    configurations = {'connector-00000': {'connector.class': CONNECTOR_CLASS, 'tasks.max': '1', 'topic': 'topic-0'},
+                      'connector-00001': {'connector.class': CONNECTOR_CLASS, 'tasks.max': '1', 'topic': 'other'},
+                      'new': {'connector.class': CONNECTOR_CLASS}}
+    report = apply_connectors(url, configurations, prune=True)
+    assert [(record['connector'], record['action'], record['result']) for record in report] == [
+        ('connector-00000', 'unchanged', 'skipped'), ('connector-00001', 'update', 'ok'), ('new', 'create', 'ok'),
+        ('connector-00002', 'delete', 'ok')]
+    assert report[1]['changes'] == {'topic': {'current': 'topic-1', 'desired': 'other'}}
+    assert sorted(cluster.connectors) == ['connector-00000', 'connector-00001', 'new']
+
+
+def test_apply_connectors_dry_run_changes_nothing(connect):
+    cluster, url = connect(connectors=1, tasks=1)
+    report = apply_connectors(url, {'new': {'connector.class': CONNECTOR_CLASS}}, prune=True, dry_run=True)
+    assert [(record['connector'], record['action'], record['result']) for record in report] == [
+        ('new', 'create', None), ('connector-00000', 'delete', None)]
+    assert list(cluster.connectors) == ['connector-00000']
+
+
+def test_create_connector_if_not_exists(connect):
+    _, url = connect(connectors=1)
+    assert create_connector(url, 'connector-00000', {'connector.class': 'Fake'}, if_not_exists=True) is None
+    with pytest.raises(RuntimeError):
+        create_connector(url, 'connector-00000', {'connector.class': 'Fake'})
+
+
+def test_create_connector_if_not_exists_created_concurrently(connect, monkeypatch):
+    # Connector is created by someone else between check and creation.
+    cluster, url = connect(connectors=0)
+    handle = cluster.handle
+
+    def create_first(method, path, query, body):
+        if method == 'POST':
+            handle(method, path, query, body)
+        return handle(method, path, query, body)
+
+    monkeypatch.setattr(cluster, 'handle', create_first)
+    assert create_connector(url, 'new', {'connector.class': 'Fake'}, if_not_exists=True) is None
+    assert list(cluster.connectors) == ['new']
+
+
+def test_wait_for_running_connector_without_tasks(connect):
+    _, url = connect(connectors=0)
+    create_connector(url, 'no-tasks', {'connector.class': 'Fake', 'tasks.max': '0'})
+    assert wait_for_connectors(url, ['no-tasks'], timeout=5) == [
+        {'connector': 'no-tasks', 'result': 'ok', 'error': None, 'state': 'RUNNING'}]
+
+
+def test_wait_for_connectors_by_pattern(connect):
+    _, url = connect(connectors=3, paused=3)
+    assert wait_for_connectors(url, connector_name_pattern='connector-0000[01]', state=State.PAUSED, timeout=5) == [
+        {'connector': 'connector-00000', 'result': 'ok', 'error': None, 'state': 'PAUSED'},
+        {'connector': 'connector-00001', 'result': 'ok', 'error': None, 'state': 'PAUSED'}]
+
+
+def test_wait_for_connector_times_out(connect):
+    _, url = connect(connectors=1, paused=1)
+    result, = wait_for_connectors(url, ['connector-00000'], state=State.RUNNING, timeout=0.5)
+    assert result['result'] == 'failed'
+    assert result['error'] == 'Timed out, connector connector-00000 in state PAUSED'
+
+
+def test_wait_stops_when_connector_fails(connect):
+    _, url = connect(connectors=2, failed_tasks=1)
+    assert wait_for_connectors(url, ['connector-00000', 'connector-00001'], timeout=30) == [
+        {'connector': 'connector-00000', 'result': 'failed', 'error': 'Connector connector-00000 failed',
+         'state': 'FAILED'},
+        {'connector': 'connector-00001', 'result': 'ok', 'error': None, 'state': 'RUNNING'}]
+
+
+def test_state_values_are_stable():
+    assert [(state.name, state.value) for state in State] == [('UNASSIGNED', 1), ('RUNNING', 2), ('PAUSED', 3),
+                                                               ('FAILED', 4), ('RESTARTING', 5)]
+
+
+def test_overall_state_is_the_worst_state():
+    connector = ConnectorStatus('a', State.RUNNING, tasks=[TaskStatus(0, State.RESTARTING)])
+    assert connector.overall_state == State.RESTARTING
+    connector.tasks.append(TaskStatus(1, State.FAILED))
+    assert connector.overall_state == State.FAILED
+
+
+@pytest.mark.parametrize('version', ['3.6.0', '2.8.0'])
+def test_restart_failed_tasks_and_wait(connect, version):
+    # The first connector is paused, its restarted task is paused too.
+    _, url = connect(connectors=3, failed_tasks=2, paused=1, restart_delay=0.3, version=version)
+    assert restart_failed_tasks(url, wait=True, timeout=10) == [
+        {'connector': 'connector-00000', 'result': 'ok', 'error': None, 'tasks': [0]},
+        {'connector': 'connector-00001', 'result': 'ok', 'error': None, 'tasks': [0]}]
+    assert list_connectors(url) == [{'connector': 'connector-00000', 'state': 'PAUSED', 'failedTasks': []},
+                                    {'connector': 'connector-00001', 'state': 'RUNNING', 'failedTasks': []},
+                                    {'connector': 'connector-00002', 'state': 'RUNNING', 'failedTasks': []}]
+
+
+def states(cluster):
+    return {name: connector['state'] for name, connector in cluster.connectors.items()}
+
+
+def restore_from(source_url, target_url, path, **options):
+    write_snapshot(snapshot_connectors(source_url, include_state=True, include_offsets=True), str(path))
+    return restore_connectors(target_url, read_snapshot(str(path)), **options)
+
+
+def test_snapshot_and_restore(connect, tmp_path):
+    source, source_url = connect(connectors=3, paused=1)
+    target, target_url = connect(connectors=0, version='3.7.0')
+    reports = restore_from(source_url, target_url, tmp_path / 'connectors.json.gz', restore_state=True)
+    assert [(report['connector'], report['action'], report['result'], report['state']) for report in reports] == [
+        ('connector-00000', 'create', 'ok', None), ('connector-00001', 'create', 'ok', None),
+        ('connector-00002', 'create', 'ok', None)]
+    assert {name: connector['config'] for name, connector in target.connectors.items()} == \
+        {name: connector['config'] for name, connector in source.connectors.items()}
+    # Paused connector is created paused.
+    assert states(target) == {'connector-00000': 'PAUSED', 'connector-00001': 'RUNNING', 'connector-00002': 'RUNNING'}
+
+
+def test_snapshot_includes_offsets(connect):
+    _, url = connect(connectors=1, version='3.5.0')
+    snapshot = snapshot_connectors(url, include_offsets=True)
+    assert snapshot['connectors']['connector-00000']['offsets'] == [
+        {'partition': {'partition': 0}, 'offset': {'position': 42}}]
+
+
+def test_restore_pauses_connector_created_by_old_worker(connect, tmp_path):
+    _, source_url = connect(connectors=2, paused=1)
+    target, target_url = connect(connectors=0, version='3.6.0')
+    reports = restore_from(source_url, target_url, tmp_path / 'connectors.json.gz', restore_state=True)
+    assert reports[0]['state'] == {'current': 'RUNNING', 'desired': 'PAUSED',
+                                   'note': 'Created running, it ran until it was paused'}
+    assert reports[1]['state'] is None
+    assert states(target) == {'connector-00000': 'PAUSED', 'connector-00001': 'RUNNING'}
+
+
+def test_restore_updates_and_resumes_existing_connectors(connect, tmp_path):
+    _, source_url = connect(connectors=2)
+    target, target_url = connect(connectors=2, paused=2)
+    target.connectors['connector-00001']['config']['topic'] = 'other'
+    reports = restore_from(source_url, target_url, tmp_path / 'connectors.json.gz', restore_state=True)
+    assert [(report['action'], report['result'], report['state']) for report in reports] == [
+        ('unchanged', 'ok', {'current': 'PAUSED', 'desired': 'RUNNING'}),
+        ('update', 'ok', {'current': 'PAUSED', 'desired': 'RUNNING'})]
+    assert target.connectors['connector-00001']['config']['topic'] == 'topic-1'
+    assert states(target) == {'connector-00000': 'RUNNING', 'connector-00001': 'RUNNING'}
+
+
+def test_restore_dry_run_changes_nothing(connect, tmp_path):
+    _, source_url = connect(connectors=2, paused=1)
+    target, target_url = connect(connectors=0)
+    reports = restore_from(source_url, target_url, tmp_path / 'connectors.json.gz', restore_state=True, dry_run=True)
+    assert [(report['action'], report['result']) for report in reports] == [('create', None), ('create', None)]
+    assert target.connectors == {}
+
+
+def test_validate_connectors(connect):
+    cluster, url = connect(connectors=0)
+    results = validate_connectors(url, {
+        'valid': {'connector.class': 'FakeSource', 'tasks.max': '1', 'topic': 'test'},
+        'incomplete': {'connector.class': CONNECTOR_CLASS},
+        'unknown': {'connector.class': 'org.example.MissingConnector'}})
+    assert results == [
+        {'connector': 'valid', 'result': 'ok', 'error': None, 'errors': {}},
+        {'connector': 'incomplete', 'result': 'failed', 'error': 'Configuration errors: 2',
+         'errors': {'tasks.max': ['Missing required configuration "tasks.max" which has no default value.'],
+                    'topic': ['Missing required configuration "topic" which has no default value.']}},
+        {'connector': 'unknown', 'result': 'failed', 'error': 'Configuration errors: 1',
+         'errors': {'connector.class': ['Connector plugin org.example.MissingConnector is not installed']}}]
+    assert cluster.connectors == {}
+
+
+def test_validate_connectors_reads_plugins_once(connect):
+    cluster, url = connect(connectors=0)
+    configurations = {'a': {'connector.class': 'FakeSource', 'tasks.max': '1', 'topic': 'test'}}
+    validate_connectors(url, configurations)
+    validate_connectors(url, configurations)
+    assert cluster.requests == 3
@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from kafka_connect.__main__ import build_parser, transport_options
+from kafka_connect.inventory import read_inventory
+from kafka_connect.transport import Transport, RetryPolicy, RetryBudget, EndpointPool, Governor, MAX_FAILURES
+
+CONNECTOR = {'name': 'new', 'config': {'connector.class': 'Fake'}}
+
+
+def test_write_is_not_retried_after_read_timeout(connect):
+    cluster, url = connect(connectors=0, latency=0.6)
+    transport = Transport(read_timeout=0.3, retry_policy=RetryPolicy(max_attempts=3, delay=0))
+    with pytest.raises(requests.ReadTimeout):
+        transport.request('POST', url, '/connectors', json=CONNECTOR)
+    assert cluster.requests == 1
+
+
+def test_read_is_retried_after_read_timeout(connect):
+    cluster, url = connect(connectors=0, latency=0.6)
+    transport = Transport(read_timeout=0.3, retry_policy=RetryPolicy(max_attempts=3, delay=0))
+    with pytest.raises(requests.ReadTimeout):
+        transport.request('GET', url, '/connectors')
+    assert cluster.requests == 3
+
+
+def test_write_is_sent_to_next_worker_after_connect_error(connect):
+    cluster, url = connect(connectors=0)
+    transport = Transport(retry_policy=RetryPolicy(max_attempts=1))
+    response = transport.request('POST', f'http://127.0.0.1:1,{url}', '/connectors', json=CONNECTOR)
+    assert response.status_code == 201
+    assert list(cluster.connectors) == ['new']
+
+
+def test_conflict_on_create_is_not_retried(connect):
+    cluster, url = connect(connectors=0)
+    transport = Transport(retry_policy=RetryPolicy(max_attempts=3, delay=0))
+    transport.request('POST', url, '/connectors', json=CONNECTOR)
+    assert transport.request('POST', url, '/connectors', json=CONNECTOR).status_code == 409
+    assert cluster.requests == 2
+
+
+def test_retryable_status_is_retried_until_attempts_run_out(connect):
+    cluster, url = connect(connectors=0, error_rate=1.0)
+    transport = Transport(retry_policy=RetryPolicy(max_attempts=3, delay=0))
+    assert transport.request('GET', url, '/connectors').status_code == 503
+    assert cluster.requests == 3
+
+
+def test_no_retry_is_made_after_deadline(connect):
+    cluster, url = connect(connectors=0, error_rate=1.0)
+    transport = Transport(retry_policy=RetryPolicy(max_attempts=3, delay=1, deadline=0.5)).for_call()
+    assert transport.request('GET', url, '/connectors').status_code == 503
+    assert cluster.requests == 1
+
+
+def test_backoff_grows_exponentially_up_to_max_delay():
+    policy = RetryPolicy(delay=1, max_delay=3)
+    for attempt, backoff in ((1, 1), (2, 2), (3, 3), (10, 3)):
+        assert backoff / 2 <= policy.backoff(attempt) <= backoff
+
+
+def test_retry_budget_is_capped():
+    budget = RetryBudget(ratio=0.5, min_retries=2)
+    for _ in range(1000):
+        budget.request()
+    assert [budget.try_retry() for _ in range(3)] == [True, True, False]
+    budget.request()
+    budget.request()
+    assert [budget.try_retry() for _ in range(2)] == [True, False]
+
+
+def test_worker_is_ejected_only_after_several_failures_in_a_row():
+    pool = EndpointPool(['http://worker-1:8083', 'http://worker-2:8083'], cooldown=60)
+    first = pool.endpoints[0]
+    for _ in range(MAX_FAILURES - 1):
+        pool.failed(first)
+    pool.succeeded(first, 0.01)
+    for _ in range(MAX_FAILURES - 1):
+        pool.failed(first)
+    assert pool.candidates(spread=False)[0] is first
+    pool.failed(first)
+    assert pool.candidates(spread=False)[0] is not first
+
+
+def test_max_failures_and_cooldown_options(tmp_path):
+    args = build_parser().parse_args(['connector', 'list', '--url', 'http://worker-1:8083', '--max-failures', '5',
+                                      '--cooldown', '60'])
+    options = transport_options(args)
+    assert (options['max_failures'], options['cooldown']) == (5, 60)
+    inventory = tmp_path / 'inventory.json'
+    inventory.write_text('{"dev": {"url": "http://worker-1:8083"}, "prod": {"url": "http://worker-2:8083", '
+                         '"max_failures": 1, "cooldown": 10}}')
+    clusters = read_inventory(str(inventory), **options)
+    assert [(cluster.transport.max_failures, cluster.transport.cooldown) for cluster in clusters] == [(5, 60), (1, 10)]
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_governor_limits_rate_of_writes_only():
+    governor = Governor(rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        governor.call(True, lambda: FakeResponse(204))
+    assert time.monotonic() - start >= 0.19
+    for _ in range(5):
+        governor.call(False, lambda: FakeResponse(200))
+    summary = governor.summary()
+    assert (summary['requests'], summary['throttled']) == (10, 4)
+
+
+def test_governor_limits_writes_in_flight():
+    governor = Governor(max_writes=2)
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def send():
+        with lock:
+            in_flight.append(None)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.pop()
+        return FakeResponse(204)
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda _: governor.call(True, send), range(12)))
+    assert max(peak) == 2
+
+
+def test_adaptive_governor_halves_rate_on_conflict_and_recovers():
+    governor = Governor(rate=100, adaptive=True, burst=100)
+    governor.call(True, lambda: FakeResponse(409))
+    assert (governor.current_rate, governor.slowdowns) == (50, 1)
+    # At most one slowdown per second.
+    governor.call(True, lambda: FakeResponse(409))
+    assert (governor.current_rate, governor.slowdowns) == (50, 1)
+    governor.call(True, lambda: FakeResponse(204))
+    assert governor.current_rate == pytest.approx(52.5)
+    for _ in range(20):
+        governor.call(True, lambda: FakeResponse(204))
+    assert governor.current_rate == 100
+
+
+def test_adaptive_governor_without_rate_lifts_limit_once_recovered():
+    governor = Governor(adaptive=True, burst=100)
+    for _ in range(7):
+        governor.call(True, lambda: FakeResponse(204))
+    # Rate of the last second is 8 writes, limit is lifted once it recovers to 16.
+    governor.call(True, lambda: FakeResponse(409))
+    assert governor.current_rate == 4
+    for _ in range(28):
+        governor.call(True, lambda: FakeResponse(204))
+    assert governor.current_rate == pytest.approx(4 * 1.05 ** 28)
+    governor.call(True, lambda: FakeResponse(204))
+    assert governor.current_rate is None
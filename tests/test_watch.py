@@ -0,0 +1,67 @@
+import json
+import threading
+from http.server import HTTPServer
+
+import pytest
+import requests
+
+from kafka_connect.watch import HealthWatcher, _handler
+
+
+@pytest.fixture
+def serve_watcher():
+    # Serves /metrics and /health of given watcher, returns its URL.
+    servers = []
+
+    def start(watcher):
+        server = HTTPServer(('127.0.0.1', 0), _handler(watcher))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_metrics_of_connector_and_task_states(connect, serve_watcher):
+    _, url = connect(connectors=2, tasks=1, failed_tasks=1)
+    watcher = HealthWatcher(url)
+    watcher.check()
+    response = requests.get(serve_watcher(watcher) + '/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    lines = response.text.splitlines()
+    assert 'kafka_connect_connector_state{connector="connector-00000",state="RUNNING"} 1' in lines
+    assert 'kafka_connect_task_state{connector="connector-00000",task="0",state="FAILED"} 1' in lines
+    assert 'kafka_connect_task_state{connector="connector-00001",task="0",state="RUNNING"} 1' in lines
+    assert 'kafka_connect_health_check_status 1' in lines
+    assert 'kafka_connect_scrape_success 1' in lines
+    assert 'kafka_connect_scrapes_total 1' in lines
+
+
+def test_states_are_kept_while_kafka_connect_is_not_readable(connect):
+    cluster, url = connect(connectors=1, tasks=1)
+    watcher = HealthWatcher(url)
+    watcher.check()
+    cluster.kafka_down = True
+    assert watcher.check().exit_code == 3
+    lines = watcher.metrics().splitlines()
+    assert 'kafka_connect_task_state{connector="connector-00000",task="0",state="RUNNING"} 1' in lines
+    assert 'kafka_connect_scrape_success 0' in lines
+    assert 'kafka_connect_scrape_errors_total 1' in lines
+
+
+def test_health(connect, serve_watcher):
+    cluster, url = connect(connectors=1, tasks=1)
+    watcher = HealthWatcher(url)
+    health_url = serve_watcher(watcher) + '/health'
+    assert requests.get(health_url).status_code == 503
+    snapshot = watcher.check()
+    response = requests.get(health_url)
+    assert response.status_code == 200
+    assert json.loads(response.text) == {'healthy': True, 'exitCode': 0, 'timestamp': snapshot.timestamp}
+    cluster.connectors['connector-00000']['tasks'][0]['state'] = 'FAILED'
+    watcher.check()
+    assert requests.get(health_url).status_code == 503